@@ -0,0 +1,106 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+
+from .cache import ConditionalGetMixin
+
+
+def run_sync_view(view, request, *args, **kwargs):
+    """
+    Выполняет синхронное DRF-представление в потоке пула: запросы к БД,
+    сериализацию и рендеринг ответа. Соединения потока закрываются
+    по тем же правилам, что и в конце обычного запроса.
+    """
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            # Готовый HttpResponse не требует ещё одного перехода в поток
+            # для рендеринга в асинхронном обработчике Django.
+            response.render()
+            rendered = HttpResponse(response.content,
+                                    status=response.status_code)
+            for header, value in response.items():
+                rendered[header] = value
+            response = rendered
+        return response
+    finally:
+        close_old_connections()
+
+
+def check_not_modified(sync_view, request, args, kwargs):
+    """
+    Проверка If-None-Match / If-Modified-Since без сериализатора
+    и запросов к данным: читаются только версии кэша (CacheVersion).
+
+    Работает только для анонимных GET и HEAD: проверка JWT может
+    потребовать запроса пользователя, поэтому запросы с Authorization
+    идут обычным путём. Возвращает ответ 304 или None.
+    """
+    viewset = sync_view.cls
+    if (not issubclass(viewset, ConditionalGetMixin)
+            or request.method not in ('GET', 'HEAD')
+            or 'HTTP_AUTHORIZATION' in request.META):
+        return None
+    actions = dict(sync_view.actions)
+    if 'get' in actions and 'head' not in actions:
+        actions['head'] = actions['get']
+    view = viewset(**sync_view.initkwargs)
+    view.action_map = actions
+    view.action = actions.get(request.method.lower())
+    view.args, view.kwargs = args, kwargs
+    view.headers = {}
+    drf_request = view.initialize_request(request, *args, **kwargs)
+    view.request = drf_request
+    view.format_kwarg = view.get_format_suffix(**kwargs)
+    try:
+        negotiated = view.perform_content_negotiation(drf_request)
+        drf_request.accepted_renderer, drf_request.accepted_media_type = (
+            negotiated
+        )
+        view.check_permissions(drf_request)
+    except APIException:
+        return None
+    try:
+        return view.check_not_modified(drf_request)
+    finally:
+        close_old_connections()
+
+
+def as_async_view(sync_view):
+    """
+    ASGI-версия представления вьюсета.
+
+    Условный GET с актуальным ETag обслуживается одним запросом версий
+    кэша, без сериализации. И эта проверка, и остальное — ORM,
+    сериализация, запись — выполняются в пуле потоков
+    (thread_sensitive=False), так что медленный запрос не блокирует
+    другие соединения воркера. В Django 3.2 нет асинхронного ORM,
+    поэтому запросы к БД выполняются в потоках.
+    """
+    run = sync_to_async(partial(run_sync_view, sync_view),
+                        thread_sensitive=False)
+    check = sync_to_async(partial(check_not_modified, sync_view),
+                          thread_sensitive=False)
+
+    async def view(request, *args, **kwargs):
+        response = await check(request, args, kwargs)
+        if response is not None:
+            return response
+        return await run(request, *args, **kwargs)
+
+    view.cls = sync_view.cls
+    view.actions = sync_view.actions
+    view.initkwargs = sync_view.initkwargs
+    view.csrf_exempt = True
+    return view
+
+
+def async_urls(urlpatterns, viewsets):
+    """Заменяет представления маршрутов viewsets на асинхронные."""
+    for pattern in urlpatterns:
+        if getattr(pattern.callback, 'cls', None) in viewsets:
+            pattern.callback = as_async_view(pattern.callback)
+    return urlpatterns
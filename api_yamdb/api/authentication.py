@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import F
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import TokenUser
+
+User = get_user_model()
+
+USER_CLAIMS = ('username', 'role', 'is_staff', 'is_superuser')
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+def get_auth_cache():
+    """
+    Кэш текущих token_version или None. Кэш должен быть общим для всех
+    процессов (Redis, Memcached): версия из кэша процесса, который
+    не видел отзыва, вернула бы старому токену прежнюю роль.
+    """
+    config = getattr(settings, 'JWT_AUTH_CACHE', {})
+    if not config.get('ALIAS'):
+        return None, None
+    return caches[config['ALIAS']], config.get('TIMEOUT', 60)
+
+
+def version_key(user_id):
+    return f'jwt:token_version:{user_id}'
+
+
+def get_token_version(user_id):
+    """
+    Текущая token_version пользователя или None, если его нет.
+    Источник истины — колонка в БД: при промахе кэша (в том числе
+    после вытеснения) версия читается оттуда.
+    """
+    cache, timeout = get_auth_cache()
+    if cache is not None:
+        version = cache.get(version_key(user_id))
+        if version is not None:
+            return version
+    version = User.objects.filter(pk=user_id).values_list(
+        'token_version', flat=True
+    ).first()
+    if cache is not None and version is not None:
+        # add, а не set: не перезаписывает версию, которую уже положил
+        # revoke_user_claims после нашего чтения из БД.
+        cache.add(version_key(user_id), version, timeout=timeout)
+    return version
+
+
+def revoke_user_claims(user_id):
+    """
+    Помечает claims всех выданных ранее токенов пользователя устаревшими.
+
+    token_version пользователя увеличивается в БД, поэтому claims старых
+    токенов больше не принимаются: токены остаются действительными,
+    но пользователь для них загружается из БД — так смена роли
+    вступает в силу сразу во всех процессах.
+    """
+    User.objects.filter(pk=user_id).update(
+        token_version=F('token_version') + 1
+    )
+    cache, timeout = get_auth_cache()
+    if cache is None:
+        return
+    version = User.objects.filter(pk=user_id).values_list(
+        'token_version', flat=True
+    ).first()
+    if version is None:
+        cache.delete(version_key(user_id))
+    else:
+        cache.set(version_key(user_id), version, timeout=timeout)
+
+
+class ClaimsAccessToken(AccessToken):
+    """Access-токен с ролью, флагами и token_version пользователя в claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Аутентификация по JWT без загрузки пользователя на каждый запрос.
+
+    request.user строится из claims токена, если token_version в токене
+    совпадает с текущей (одна колонка по первичному ключу или общий кэш
+    из JWT_AUTH_CACHE). Если claims нет (старый токен) или они отозваны
+    через revoke_user_claims, пользователь загружается из БД.
+    Токен удалённого пользователя не принимается.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = get_token_version(user_id)
+        if version is None:
+            raise AuthenticationFailed('User not found',
+                                       code='user_not_found')
+        if (validated_token.get(TOKEN_VERSION_CLAIM) != version
+                or not all(claim in validated_token
+                           for claim in USER_CLAIMS)):
+            return super().get_user(validated_token)
+        claims = {claim: validated_token[claim] for claim in USER_CLAIMS}
+        return TokenUser(id=user_id, is_active=True, **claims)
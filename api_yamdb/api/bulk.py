@@ -0,0 +1,321 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections, router, transaction
+from django.utils.functional import cached_property
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import MethodNotAllowed, ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+
+from .fields import BatchedSlugRelatedField
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    many=True сериализатор bulk/ эндпоинтов.
+
+    Все элементы проверяются до записи, ошибки возвращаются списком
+    по позициям элементов. Slug связей всех элементов ищутся одним
+    запросом на модель, занятые значения уникальных полей — одним
+    запросом на поле, объекты вставляются bulk_create, строки
+    many-to-many — одним bulk_create на поле.
+    """
+
+    @cached_property
+    def unique_validators(self):
+        """
+        UniqueValidator полей элемента, снятые с полей: иначе каждый
+        элемент проверялся бы отдельным запросом. Их проверяет
+        check_existing.
+        """
+        unique = {}
+        for name, field in self.child.fields.items():
+            validators = [validator for validator in field.validators
+                          if isinstance(validator, UniqueValidator)]
+            if validators and not field.read_only:
+                field.validators = [validator
+                                    for validator in field.validators
+                                    if validator not in validators]
+                unique[name] = (field, validators)
+        return unique
+
+    def get_batched_fields(self):
+        for name, field in self.child.fields.items():
+            relation = getattr(field, 'child_relation', field)
+            if (isinstance(relation, BatchedSlugRelatedField)
+                    and not field.read_only):
+                yield name, relation
+
+    def resolve_slugs(self, data):
+        resolved = self.context.setdefault('resolved_slugs', {})
+        for name, relation in self.get_batched_fields():
+            slugs = set()
+            for item in data:
+                value = item.get(name) if isinstance(item, dict) else None
+                values = value if isinstance(value, list) else [value]
+                slugs.update(slug for slug in values
+                             if isinstance(slug, str))
+            objects = relation.get_queryset().filter(
+                **{f'{relation.slug_field}__in': slugs}
+            )
+            resolved[(relation.queryset.model, relation.slug_field)] = {
+                getattr(obj, relation.slug_field): obj for obj in objects
+            }
+
+    def check_existing(self, unique, instances, validated, errors):
+        """Значения уникальных полей, занятые другими объектами в БД."""
+        for name, (field, validators) in unique.items():
+            source = field.source_attrs[-1]
+            values = {attrs[source] for attrs in validated
+                      if attrs and attrs.get(source) is not None}
+            for validator in validators:
+                taken = dict(validator.queryset.filter(
+                    **{f'{source}__in': values}
+                ).values_list(source, 'pk')) if values else {}
+                for instance, attrs, item_errors in zip(instances, validated,
+                                                        errors):
+                    value = (attrs or {}).get(source)
+                    if value in taken and (instance is None
+                                           or taken[value] != instance.pk):
+                        item_errors.setdefault(name, []).append(
+                            validator.message
+                        )
+
+    def check_unique(self, validated, errors):
+        """Повтор значения уникального поля внутри одного запроса."""
+        model = self.child.Meta.model
+        for field in model._meta.concrete_fields:
+            if not field.unique or field.primary_key:
+                continue
+            seen = set()
+            for attrs, item_errors in zip(validated, errors):
+                value = (attrs or {}).get(field.name)
+                if value is None:
+                    continue
+                if value in seen:
+                    item_errors.setdefault(field.name, []).append(
+                        'Значение повторяется в запросе.'
+                    )
+                seen.add(value)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Ожидается непустой список объектов.'
+            ]})
+        self.resolve_slugs(data)
+        unique = self.unique_validators
+        instances = self.instance or [None] * len(data)
+        validated, errors = [], []
+        for instance, item in zip(instances, data):
+            self.child.instance = instance
+            try:
+                validated.append(self.child.run_validation(item))
+                errors.append({})
+            except ValidationError as exc:
+                validated.append(None)
+                errors.append(exc.detail)
+        self.child.instance = None
+        self.check_existing(unique, instances, validated, errors)
+        self.check_unique(validated, errors)
+        if any(errors):
+            raise ValidationError(errors)
+        return validated
+
+    def split_many_to_many(self, attrs):
+        model = self.child.Meta.model
+        return {field: attrs.pop(field.name)
+                for field in model._meta.many_to_many
+                if field.name in attrs}
+
+    def set_many_to_many(self, objects, values, replace=False):
+        """Строки промежуточных таблиц — одним запросом на поле."""
+        for field in self.child.Meta.model._meta.many_to_many:
+            owners = [(obj, value[field]) for obj, value
+                      in zip(objects, values) if field in value]
+            if not owners:
+                continue
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            if replace:
+                through.objects.filter(**{
+                    f'{source}__in': [obj.pk for obj, _ in owners]
+                }).delete()
+            through.objects.bulk_create([
+                through(**{source: obj.pk, target: related.pk})
+                for obj, related_objects in owners
+                for related in related_objects
+            ])
+
+    def refetch(self, objects):
+        """Объекты со связями для ответа — без запроса на каждый."""
+        model = self.child.Meta.model
+        related = [field.name for field in model._meta.concrete_fields
+                   if field.is_relation]
+        many_to_many = [field.name for field in model._meta.many_to_many]
+        if not related and not many_to_many:
+            return objects
+        queryset = model._default_manager.prefetch_related(*many_to_many)
+        if related:
+            queryset = queryset.select_related(*related)
+        fetched = queryset.in_bulk([obj.pk for obj in objects])
+        return [fetched[obj.pk] for obj in objects]
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        many_to_many = [self.split_many_to_many(attrs)
+                        for attrs in validated_data]
+        objects = [model(**attrs) for attrs in validated_data]
+        using = router.db_for_write(model)
+        connection = connections[using]
+        needs_pk = (any(many_to_many)
+                    or model._meta.pk.name in self.child.fields)
+        returns_pk = connection.features.can_return_rows_from_bulk_insert
+        if needs_pk and not returns_pk and connection.vendor != 'sqlite':
+            for obj in objects:
+                obj.save()
+        else:
+            model._default_manager.bulk_create(objects)
+            if needs_pk and not returns_pk:
+                self.set_sqlite_pks(connection, objects)
+            self.saved(objects, using)
+        self.set_many_to_many(objects, many_to_many)
+        return self.refetch(objects)
+
+    def saved(self, objects, using):
+        """
+        Вызывается после bulk_create и bulk_update, которые обходят
+        save() и post_save: здесь наследники одним запросом на список
+        обновляют то, что иначе обновлял бы обработчик сигнала.
+        """
+
+    def set_sqlite_pks(self, connection, objects):
+        """
+        id объектов после bulk_create в SQLite, где Django 3.2
+        не использует RETURNING. Транзакция bulk-запроса держит
+        блокировку записи с первого INSERT до коммита, поэтому строки
+        получают id подряд, последний из них — last_insert_rowid().
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT last_insert_rowid()')
+            last_pk = cursor.fetchone()[0]
+        for pk, obj in enumerate(objects, last_pk - len(objects) + 1):
+            obj.pk = pk
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        many_to_many = [self.split_many_to_many(attrs)
+                        for attrs in validated_data]
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+                fields.add(name)
+        if fields:
+            model._default_manager.bulk_update(instances, fields)
+        self.set_many_to_many(instances, many_to_many, replace=True)
+        self.saved(instances, router.db_for_write(model))
+        return self.refetch(instances)
+
+
+class BulkMixin:
+    """
+    Эндпоинт bulk/ вьюсета:
+
+    - POST — список объектов для создания;
+    - PATCH — список объектов с полем bulk_lookup_field для изменения;
+    - DELETE — список значений bulk_lookup_field для удаления.
+
+    Запрос выполняется в одной транзакции: при ошибке в любом элементе
+    ничего не записывается, а ответ 400 содержит ошибки по позициям.
+    Сериализатор вьюсета должен использовать BulkListSerializer.
+    """
+    bulk_actions = ('create', 'update', 'destroy')
+    bulk_lookup_field = 'pk'
+
+    @action(detail=False, methods=['post', 'patch', 'delete'],
+            url_path='bulk')
+    def bulk(self, request):
+        operation = {'POST': 'create', 'PATCH': 'update',
+                     'DELETE': 'destroy'}[request.method]
+        if operation not in self.bulk_actions:
+            raise MethodNotAllowed(request.method)
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Ожидается непустой список.'
+            ]})
+        limit = getattr(settings, 'API_BULK_MAX_ITEMS', 1000)
+        if len(items) > limit:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f'Не больше {limit} объектов за запрос.'
+            ]})
+        with transaction.atomic():
+            return getattr(self, f'bulk_{operation}')(items)
+
+    def get_bulk_objects(self, values):
+        """
+        Объекты по значениям bulk_lookup_field и ошибки по позициям.
+        Значения приводятся к типу поля модели: id можно передать
+        и строкой ("5").
+        """
+        lookup = self.bulk_lookup_field
+        model = self.get_queryset().model
+        field = (model._meta.pk if lookup == 'pk'
+                 else model._meta.get_field(lookup))
+        keys, errors = [], []
+        for value in values:
+            key, error = None, {}
+            if value is None:
+                error = {lookup: ['Обязательное поле.']}
+            elif not isinstance(value, (int, str)) or isinstance(value, bool):
+                error = {lookup: ['Некорректное значение.']}
+            else:
+                try:
+                    key = field.to_python(value)
+                except DjangoValidationError:
+                    error = {lookup: ['Некорректное значение.']}
+            keys.append(key)
+            errors.append(error)
+        found = self.get_queryset().prefetch_related(None).in_bulk(
+            {key for key in keys if key is not None}, field_name=lookup
+        )
+        objects = []
+        for key, error in zip(keys, errors):
+            obj = found.get(key) if key is not None else None
+            if obj is None and not error:
+                error.setdefault(lookup, ['Объект не найден.'])
+            objects.append(obj)
+        if any(errors):
+            raise ValidationError(errors)
+        return objects
+
+    def bulk_create(self, items):
+        serializer = self.get_serializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, items):
+        lookup = self.bulk_lookup_field
+        instances = self.get_bulk_objects([
+            item.get(lookup) if isinstance(item, dict) else None
+            for item in items
+        ])
+        serializer = self.get_serializer(instances, data=items, many=True,
+                                         partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    def bulk_destroy(self, values):
+        objects = self.get_bulk_objects(values)
+        self.bulk_deleted = [getattr(obj, self.bulk_lookup_field)
+                             for obj in objects]
+        self.get_queryset().filter(
+            pk__in=[obj.pk for obj in objects]
+        ).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,243 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import permissions
+from rest_framework.response import Response
+
+from api_yamdb.db import pin_primary
+from reviews.models import CacheVersion
+
+
+class ResponseCache:
+    """
+    Кэш ответов read-only эндпоинтов каталога.
+
+    Ключ строится из пространства имён, его текущей версии, роли
+    пользователя, формата ответа и пути с query string. Инвалидация
+    не перебирает ключи: запись увеличивает версию пространства имён
+    в CacheVersion, и старые ответы просто перестают находиться —
+    во всех процессах, даже если сам кэш у каждого процесса свой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = Counter()
+        self._misses = Counter()
+
+    @property
+    def config(self):
+        return getattr(settings, 'API_CACHE', {})
+
+    @property
+    def cache(self):
+        return caches[self.config.get('ALIAS', 'default')]
+
+    @property
+    def enabled(self):
+        return self.config.get('ENABLED', True)
+
+    def get_state(self, namespaces, request=None):
+        """
+        Версии пространств имён и время последнего изменения любого
+        из них (секунды с долями) — одним запросом к CacheVersion.
+        Прочитанное запоминается на request до конца запроса.
+        """
+        known = getattr(request, '_cache_versions', None)
+        if known is None:
+            known = {}
+            if request is not None:
+                request._cache_versions = known
+        missing = [name for name in namespaces if name not in known]
+        if missing:
+            known.update(CacheVersion.objects.get_state(missing))
+        versions = [known[name][0] for name in namespaces]
+        return versions, max(known[name][1] for name in namespaces)
+
+    def invalidate(self, *namespaces):
+        CacheVersion.objects.bump(namespaces)
+
+    def make_key(self, namespace, request, vary=()):
+        user = request.user
+        role = user.role if user.is_authenticated else 'anonymous'
+        media_type = getattr(request, 'accepted_media_type', '')
+        raw = '|'.join((
+            role, str(user.is_authenticated and user.is_admin),
+            media_type, request.get_full_path(), *map(str, vary)
+        ))
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        (version,), _ = self.get_state((namespace,), request)
+        return f'api-cache:{namespace}:{version}:{digest}'
+
+    def get_validators(self, namespaces, request, vary=()):
+        """
+        ETag и Last-Modified ответа без построения его тела.
+
+        ETag зависит от версий пространств имён, формата ответа,
+        пути с query string и значений vary, поэтому меняется после
+        любой записи в эти пространства имён.
+        """
+        versions, modified_at = self.get_state(namespaces, request)
+        raw = '|'.join((
+            *namespaces, *map(str, versions),
+            getattr(request, 'accepted_media_type', ''),
+            request.get_full_path(), *map(str, vary)
+        ))
+        return f'"{hashlib.md5(raw.encode()).hexdigest()}"', modified_at
+
+    def get_or_set(self, namespace, request, get_response, vary=()):
+        """
+        Возвращает ответ из кэша или строит и кэширует новый.
+        vary — значения помимо запроса, от которых зависит ответ.
+        """
+        if not self.enabled:
+            return get_response()
+        key = self.make_key(namespace, request, vary)
+        data = self.cache.get(key)
+        if data is not None:
+            self._count(self._hits, namespace)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        self._count(self._misses, namespace)
+        response = get_response()
+        if response.status_code == 200:
+            self.cache.set(key, response.data,
+                           timeout=self.config.get('TIMEOUT', 300))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def _count(self, counter, namespace):
+        with self._lock:
+            counter[namespace] += 1
+
+    def stats(self):
+        """Счётчики попаданий и промахов текущего процесса."""
+        with self._lock:
+            return {
+                namespace: {
+                    'hits': self._hits[namespace],
+                    'misses': self._misses[namespace],
+                }
+                for namespace in set(self._hits) | set(self._misses)
+            }
+
+
+response_cache = ResponseCache()
+
+
+class CacheInvalidationMixin:
+    """
+    Сбрасывает пространства имён get_cache_invalidates() после каждого
+    успешного небезопасного запроса к вьюсету.
+    """
+    cache_invalidates = ()
+
+    def get_cache_invalidates(self):
+        return self.cache_invalidates
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (request.method not in permissions.SAFE_METHODS
+                and response.status_code < 400):
+            response_cache.invalidate(*self.get_cache_invalidates())
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class NotModified(Exception):
+    """Прерывает обработку запроса готовым ответом 304 или 412."""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+class ConditionalGetMixin(CacheInvalidationMixin):
+    """
+    Условные GET для list и retrieve.
+
+    ETag и Last-Modified берутся из версий пространств имён
+    get_cache_namespaces() (один запрос к CacheVersion), а не из тела
+    ответа, поэтому при совпадении If-None-Match или If-Modified-Since
+    ответ 304 отдаётся сразу после проверки прав — до запросов к данным
+    и работы сериализатора. Last-Modified с точностью до секунды
+    отдаётся и проверяется, только когда секунда последнего изменения
+    уже прошла: иначе запись в ту же секунду не изменила бы его.
+    Сразу после записи в коллекцию чтение идёт с основной базы,
+    даже если вьюсет читает с реплик.
+    """
+    cache_namespace = None
+    conditional_actions = ('list', 'retrieve')
+
+    def get_cache_namespaces(self):
+        return (self.cache_namespace,)
+
+    def get_cache_vary(self):
+        """Значения помимо запроса, от которых зависит ответ действия."""
+        return ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        response = self.check_not_modified(request)
+        if response is not None:
+            raise NotModified(response)
+
+    def check_not_modified(self, request):
+        """
+        Вычисляет ETag и Last-Modified запроса и возвращает ответ 304
+        (или 412), если клиенту не нужно новое тело, иначе None.
+        """
+        self.conditional_validators = None
+        if (request.method not in ('GET', 'HEAD')
+                or self.action not in self.conditional_actions):
+            return None
+        etag, modified_at = response_cache.get_validators(
+            self.get_cache_namespaces(), request, self.get_cache_vary()
+        )
+        now = time.time()
+        last_modified = int(modified_at)
+        if last_modified + 1 > now:
+            last_modified = None
+        self.conditional_validators = etag, last_modified
+        if now - modified_at <= getattr(settings, 'DATABASE_REPLICA_LAG', 0):
+            # Коллекция только что менялась: реплика может отставать.
+            pin_primary()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            self.set_validators(response)
+        return response
+
+    def set_validators(self, response):
+        validators = getattr(self, 'conditional_validators', None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        self.set_validators(response)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class CachedListMixin(ConditionalGetMixin):
+    """Кэширует list вьюсета в пространстве имён cache_namespace."""
+
+    def list(self, request, *args, **kwargs):
+        return response_cache.get_or_set(
+            self.cache_namespace, request,
+            lambda: super(CachedListMixin, self).list(
+                request, *args, **kwargs
+            ), self.get_cache_vary()
+        )
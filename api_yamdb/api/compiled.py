@@ -0,0 +1,63 @@
+from rest_framework import serializers
+
+from .fieldsets import check_names
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+    """Список для ValuesSerializer: prepare() один раз на страницу."""
+
+    def to_representation(self, data):
+        rows = list(data)
+        self.child.prepare(rows)
+        represent = self.child.to_representation
+        return [represent(row) for row in rows]
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Сериализатор только для чтения, который строит ответ из строк
+    QuerySet.values(), не обходя объекты полей DRF и не создавая
+    экземпляры моделей.
+
+    field_order — поля ответа в порядке обычного сериализатора,
+    columns — колонки .values() для каждого поля. Значение поля берёт
+    метод render_<поле>(row), по умолчанию row[<поле>]. Связанные
+    списки загружаются в prepare() одним запросом на страницу.
+    Поддерживает ?fields= (см. SparseFieldsetMixin).
+    """
+    field_order = ()
+    columns = {}
+
+    class Meta:
+        list_serializer_class = ValuesListSerializer
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        check_names('expand', expand, ())
+        if fields is not None:
+            check_names('fields', fields, self.field_order)
+        self.names = tuple(name for name in self.field_order
+                           if fields is None or name in fields)
+        # Методы отбираются один раз, а не на каждой строке.
+        self.renderers = tuple(
+            (name, getattr(self, f'render_{name}', None))
+            for name in self.names
+        )
+
+    def values_queryset(self, queryset):
+        columns = dict.fromkeys(
+            column for name in self.names
+            for column in self.columns.get(name, (name,))
+        )
+        return queryset.select_related(None).prefetch_related(
+            None
+        ).values(*columns)
+
+    def prepare(self, rows):
+        pass
+
+    def to_representation(self, row):
+        return {
+            name: row[name] if render is None else render(row)
+            for name, render in self.renderers
+        }
@@ -0,0 +1,77 @@
+from django.utils.encoding import smart_str
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class BatchedSlugRelatedField(serializers.SlugRelatedField):
+    """
+    SlugRelatedField, который в bulk-запросе берёт объект из словаря,
+    заполненного BulkListSerializer одним запросом на все элементы.
+    Вне bulk-запроса работает как обычный SlugRelatedField.
+    С many=True весь список slug ищется одним запросом
+    (ManySlugRelatedField).
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManySlugRelatedField(**list_kwargs)
+
+    def get_resolved(self):
+        """Словарь {slug: объект} bulk-запроса или None."""
+        return self.context.get('resolved_slugs', {}).get(
+            (self.queryset.model, self.slug_field)
+        )
+
+    def resolve(self, slugs):
+        resolved = self.get_resolved()
+        if resolved is not None:
+            return resolved
+        return {
+            getattr(obj, self.slug_field): obj
+            for obj in self.get_queryset().filter(
+                **{f'{self.slug_field}__in': set(slugs)}
+            )
+        }
+
+    def to_internal_value(self, data):
+        resolved = self.get_resolved()
+        if resolved is None:
+            return super().to_internal_value(data)
+        if not isinstance(data, str):
+            self.fail('invalid')
+        try:
+            return resolved[data]
+        except KeyError:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=smart_str(data))
+
+
+class ManySlugRelatedField(serializers.ManyRelatedField):
+    """
+    Список slug одним запросом slug__in вместо запроса на каждый slug.
+    Все отсутствующие slug перечисляются в одной ошибке, повторы
+    в списке отбрасываются.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Объекты с {slug_name} не найдены: {values}.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        relation = self.child_relation
+        if not all(isinstance(slug, str) for slug in data):
+            relation.fail('invalid')
+        slugs = list(dict.fromkeys(data))
+        resolved = relation.resolve(slugs)
+        missing = [slug for slug in slugs if slug not in resolved]
+        if missing:
+            self.fail('does_not_exist', slug_name=relation.slug_field,
+                      values=', '.join(missing))
+        return [resolved[slug] for slug in slugs]
@@ -0,0 +1,147 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def split_names(value):
+    return tuple(name.strip() for name in value.split(',') if name.strip())
+
+
+def check_names(param, names, known):
+    """ValidationError (400) для имён из ?fields= или ?expand= не из known."""
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise ValidationError({param: [
+            f'Неизвестные поля: {", ".join(unknown)}.'
+        ]})
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Выбор полей ответа: fields — какие поля оставить,
+    expand — какие поля заменить вложенными объектами
+    из Meta.expandable_fields ({имя: класс сериализатора}).
+    """
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested_fields = fields
+        self.expand = expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        check_names('expand', self.expand, expandable)
+        for name in self.expand:
+            fields[name] = expandable[name](read_only=True)
+        if self.requested_fields is None:
+            return fields
+        check_names('fields', self.requested_fields, fields)
+        return {name: field for name, field in fields.items()
+                if name in self.requested_fields or name in self.expand}
+
+
+def get_lookups(serializer, prefix=''):
+    """
+    Пути к полям модели, которые читает сериализатор
+    (category__slug, genre__name...). Поля, источник которых не поле
+    модели, описываются в Meta.field_sources. None — путь не определить.
+    """
+    sources = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+    lookups = []
+    for name, field in serializer.fields.items():
+        if name in sources:
+            lookups += [prefix + source for source in sources[name]]
+            continue
+        if field.source == '*':
+            return None
+        path = prefix + '__'.join(field.source_attrs)
+        if isinstance(field, serializers.ListSerializer):
+            field = field.child
+        elif isinstance(field, serializers.ManyRelatedField):
+            field = field.child_relation
+        if isinstance(field, serializers.BaseSerializer):
+            nested = get_lookups(field, path + '__')
+            if nested is None:
+                return None
+            lookups += nested
+        elif isinstance(field, serializers.SlugRelatedField):
+            lookups.append(f'{path}__{field.slug_field}')
+        else:
+            lookups.append(path)
+    return lookups
+
+
+def get_query_plan(model, lookups):
+    """
+    Колонки для only(), связи для select_related() и prefetch_related(),
+    нужные, чтобы прочитать lookups. None — если путь не поле модели.
+    """
+    columns, select, prefetch = set(), set(), set()
+    for lookup in lookups:
+        opts = model._meta
+        parts = lookup.split('__')
+        for idx, part in enumerate(parts, start=1):
+            try:
+                field = opts.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            path = '__'.join(parts[:idx])
+            if field.many_to_many or field.one_to_many:
+                prefetch.add(path)
+                break
+            columns.add(path)
+            if not field.is_relation or idx == len(parts):
+                break
+            select.add(path)
+            opts = field.related_model._meta
+    return columns, select, prefetch
+
+
+class SparseFieldsetMixin:
+    """
+    Параметры ?fields= и ?expand= для list и retrieve.
+
+    Кроме ответа, выбранные поля сокращают и запрос к БД: SELECT
+    читает только нужные колонки (only()), а select_related
+    и prefetch_related остаются только для запрошенных связей.
+    Поля из fieldset_required читаются всегда: ключ курсорной
+    пагинации и внешний ключ на родителя, который related manager
+    читает у каждой строки.
+    """
+    fieldset_actions = ('list', 'retrieve')
+    fieldset_required = ()
+
+    @cached_property
+    def fieldset(self):
+        params = self.request.query_params
+        fields = params.get('fields')
+        return (split_names(fields) if fields else None,
+                split_names(params.get('expand', '')))
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.fieldset_actions:
+            kwargs['fields'], kwargs['expand'] = self.fieldset
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.fieldset_actions:
+            return queryset
+        serializer = self.get_serializer()
+        if hasattr(serializer, 'values_queryset'):
+            # ValuesSerializer (api/compiled.py) сам выбирает колонки.
+            return serializer.values_queryset(queryset)
+        lookups = get_lookups(serializer)
+        plan = lookups and get_query_plan(
+            queryset.model, [*lookups, *self.fieldset_required]
+        )
+        if not plan:
+            return queryset
+        columns, select, prefetch = plan
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select:
+            # select_related() без аргументов подтянул бы все связи.
+            queryset = queryset.select_related(*select)
+        return queryset.prefetch_related(*prefetch).only(*columns)
@@ -1,22 +1,84 @@
+from django.db.models import Count
 from django_filters import rest_framework as filters
 
-from reviews.models import Title
+from reviews.models import Category, Genre, Title
+from reviews.search import search_titles
+
+
+def split_slugs(value):
+    return {slug.strip() for slug in value.split(',') if slug.strip()}
 
 
 class TitlesFilter(filters.FilterSet):
+    """
+    Фильтры списка произведений.
+
+    genre и category принимают точный slug или несколько slug через
+    запятую. Slug сначала переводятся в id по уникальному индексу,
+    затем фильтр идёт по индексированным колонкам category_id
+    и reviews_title_genre.genre_id. Для genre параметр genre_match=all
+    требует все перечисленные жанры (по умолчанию any — любой из них).
+    Поиск по подстроке slug — genre_contains и category_contains.
+    """
+    GENRE_MATCH_CHOICES = (
+        ('any', 'any'),
+        ('all', 'all'),
+    )
+
     name = filters.CharFilter(
         field_name='name',
         lookup_expr='icontains'
     )
     category = filters.CharFilter(
+        method='filter_category'
+    )
+    genre = filters.CharFilter(
+        method='filter_genre'
+    )
+    genre_match = filters.ChoiceFilter(
+        choices=GENRE_MATCH_CHOICES,
+        method='filter_genre_match'
+    )
+    category_contains = filters.CharFilter(
         field_name='category__slug',
         lookup_expr='icontains'
     )
-    genre = filters.CharFilter(
+    genre_contains = filters.CharFilter(
         field_name='genre__slug',
-        lookup_expr='icontains'
+        lookup_expr='icontains',
+        distinct=True
+    )
+    search = filters.CharFilter(
+        method='filter_search'
     )
 
     class Meta:
         model = Title
         fields = ['name', 'year', 'genre', 'category']
+
+    def filter_category(self, queryset, name, value):
+        ids = list(Category.objects.filter(
+            slug__in=split_slugs(value)
+        ).values_list('id', flat=True))
+        return queryset.filter(category_id__in=ids)
+
+    def filter_genre(self, queryset, name, value):
+        slugs = split_slugs(value)
+        ids = list(Genre.objects.filter(
+            slug__in=slugs
+        ).values_list('id', flat=True))
+        title_genres = Title.genre.through.objects.filter(genre_id__in=ids)
+        if self.data.get('genre_match') == 'all':
+            if len(ids) < len(slugs):
+                return queryset.none()
+            title_genres = title_genres.values('title_id').annotate(
+                genres=Count('genre_id')
+            ).filter(genres=len(ids))
+        return queryset.filter(pk__in=title_genres.values('title_id'))
+
+    def filter_genre_match(self, queryset, name, value):
+        # Учитывается в filter_genre.
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
@@ -0,0 +1,229 @@
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    """
+    Фоновая отправка писем.
+
+    Письма попадают в очередь в памяти и, если включён OUTBOX,
+    в таблицу OutgoingEmail. Пул потоков забирает их пачками
+    и отправляет каждую пачку через одно SMTP-соединение.
+    Неудачная отправка повторяется с нарастающей задержкой,
+    пока не исчерпан MAX_ATTEMPTS.
+
+    Письмо из OUTBOX отправляется, только если его удалось забрать
+    (_claim): восстановление очереди в нескольких процессах, повторы
+    по таймеру и send_queued_mail не отправляют его дважды. Письма,
+    забранные дольше SENDING_TIMEOUT секунд назад (процесс упал во время
+    отправки), снова считаются pending.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._started_at = timezone.now()
+
+    @property
+    def config(self):
+        return getattr(settings, 'EMAIL_QUEUE', {})
+
+    def send(self, subject, message, recipient_list, from_email=None):
+        email = OutgoingEmail(
+            subject=subject,
+            body=message,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=','.join(recipient_list)
+        )
+        if self.config.get('OUTBOX', True):
+            email.save()
+        if not self.config.get('ASYNC', True):
+            self.deliver([email])
+            return email
+        transaction.on_commit(lambda: self.submit(email))
+        return email
+
+    def submit(self, email):
+        self._ensure_workers()
+        self._queue.put(email)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def join(self):
+        """Ждёт, пока очередь не опустеет (для тестов и shutdown)."""
+        self._queue.join()
+
+    def deliver_pending(self):
+        """
+        Синхронно отправляет письма из OUTBOX со статусом pending.
+
+        Каждое письмо обрабатывается не больше одного раза за вызов.
+        Возвращает число отправленных писем.
+        """
+        batch_size = self.config.get('BATCH_SIZE', 50)
+        self._release_stale()
+        pending = OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING
+        ).order_by('pk')
+        last_pk = 0
+        sent = 0
+        while True:
+            batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return sent
+            self.deliver(batch)
+            sent += sum(email.status == OutgoingEmail.SENT for email in batch)
+            last_pk = batch[-1].pk
+
+    def deliver(self, batch):
+        """Отправляет пачку писем через одно соединение с почтовым сервером."""
+        batch = self._claim(batch)
+        if not batch:
+            return
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as error:
+            for email in batch:
+                self._failed(email, error)
+            return
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=email.from_email,
+                    to=email.recipients,
+                    connection=connection
+                )
+                try:
+                    message.send()
+                except Exception as error:
+                    self._failed(email, error)
+                else:
+                    self._sent(email)
+        finally:
+            connection.close()
+
+    def _claim(self, batch):
+        """
+        Оставляет в пачке письма, которые удалось перевести из pending
+        в sending. Письма без OUTBOX (pk is None) не забираются.
+        """
+        claimed = []
+        for email in batch:
+            if email.pk is not None:
+                now = timezone.now()
+                if not OutgoingEmail.objects.filter(
+                    pk=email.pk, status=OutgoingEmail.PENDING
+                ).update(status=OutgoingEmail.SENDING, claimed_at=now):
+                    continue
+                email.status, email.claimed_at = OutgoingEmail.SENDING, now
+            claimed.append(email)
+        return claimed
+
+    def _release_stale(self):
+        """Возвращает в pending письма, зависшие в sending."""
+        timeout = timedelta(seconds=self.config.get('SENDING_TIMEOUT', 600))
+        return OutgoingEmail.objects.filter(
+            status=OutgoingEmail.SENDING,
+            claimed_at__lt=timezone.now() - timeout
+        ).update(status=OutgoingEmail.PENDING)
+
+    def _sent(self, email):
+        email.attempts += 1
+        email.status = OutgoingEmail.SENT
+        email.sent_at = timezone.now()
+        email.last_error = ''
+        self._save(email)
+
+    def _failed(self, email, error):
+        email.attempts += 1
+        email.last_error = str(error)
+        retry = email.attempts < self.config.get('MAX_ATTEMPTS', 3)
+        email.status = OutgoingEmail.PENDING if retry else OutgoingEmail.FAILED
+        self._save(email)
+        logger.warning('Email %s to %s failed (attempt %s): %s',
+                       email.pk, email.to, email.attempts, error)
+        if retry and self.config.get('ASYNC', True):
+            delay = self.config.get('RETRY_DELAY', 30) * email.attempts
+            timer = threading.Timer(delay, self.submit, args=(email,))
+            timer.daemon = True
+            timer.start()
+
+    def _save(self, email):
+        if email.pk is not None:
+            email.save(update_fields=(
+                'status', 'attempts', 'last_error', 'sent_at'
+            ))
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            for idx in range(self.config.get('WORKERS', 2)):
+                worker = threading.Thread(
+                    target=self._work,
+                    name=f'mail-queue-{idx}',
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+            if self.config.get('OUTBOX', True):
+                threading.Thread(target=self._recover, daemon=True).start()
+
+    def _recover(self):
+        """Возвращает в очередь письма, не отправленные до перезапуска."""
+        try:
+            self._release_stale()
+            pending = OutgoingEmail.objects.filter(
+                status=OutgoingEmail.PENDING,
+                created__lt=self._started_at
+            )
+            for email in pending.iterator():
+                self._queue.put(email)
+        except Exception:
+            logger.exception('Failed to recover pending emails')
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.config.get('BATCH_WAIT', 0.5)
+        while len(batch) < self.config.get('BATCH_SIZE', 50):
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self.deliver(batch)
+            except Exception:
+                logger.exception('Failed to deliver email batch')
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+mail_queue = MailQueue()
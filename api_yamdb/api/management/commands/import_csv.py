@@ -1,100 +1,372 @@
-from django.core.management.base import BaseCommand
-
-import os
 import csv
-import sqlite3
-
-VALID_DATA = {
-    'users': {
-        'table_name': 'users_user',
-        'fieldnames': ['id', 'password', 'last_login', 'is_superuser',
-                       'is_staff', 'is_active', 'date_joined', 'username',
-                       'email', 'first_name', 'last_name', 'bio', 'role',
-                       'confirmation_code'],
-        'order': [0, 7, 8, 12, 13, 9, 10, 1, 2, 11, 4, 5, 3, 6]
-    },
-    'titles': {
-        'table_name': 'reviews_title',
-        'fieldnames': ['id', 'name', 'year', 'description', 'category_id'],
-        'order': [0, 1, 2, 4, 3]
-    },
-    'comments': {
-        'table_name': 'reviews_comment'
-    },
-    'genre_title': {
-        'table_name': 'reviews_title_genre'
-    },
-    'category': {
-        'table_name': 'reviews_category'
-    },
-    'genre': {
-        'table_name': 'reviews_genre'
-    },
-    'review': {
-        'table_name': 'reviews_review'
-    },
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connections, transaction
+
+from reviews.models import (CacheVersion, Category, Comment, Genre, Review,
+                            Title)
+
+User = get_user_model()
+
+MODELS = {
+    'category': Category,
+    'genre': Genre,
+    'users': User,
+    'titles': Title,
+    'genre_title': Title.genre.through,
+    'review': Review,
+    'comments': Comment,
 }
 
+# Этапы в порядке зависимостей: справочники и пользователи загружаются
+# раньше произведений, отзывов и комментариев, которые на них ссылаются.
+# Таблицы одного этапа друг от друга не зависят и грузятся параллельно.
+IMPORT_STAGES = (
+    ('category', 'genre', 'users'),
+    ('titles',),
+    ('genre_title', 'review'),
+    ('comments',),
+)
+
+
+class CsvTableLoader:
+    """
+    Потоковая загрузка одного csv-файла в таблицу модели.
+
+    Колонки csv сопоставляются полям модели по имени (author -> author_id
+    для внешних ключей), значения приводятся через to_python
+    и get_db_prep_save поля, а недостающие поля заполняются значениями
+    по умолчанию. Строки вставляются пачками через executemany
+    с игнорированием конфликтов, поэтому повторный импорт безопасен,
+    а auto_now_add не перетирает даты из файла.
+
+    Внешние ключи каждой пачки проверяются до вставки одним запросом
+    на поле: при отключённых проверках ограничений (SQLite) строки
+    со ссылкой на несуществующую запись иначе загрузились бы молча,
+    а PostgreSQL отклонил бы пачку без указания строки файла.
+    """
+
+    def __init__(self, model, using='default', batch_size=1000):
+        self.model = model
+        self.connection = connections[using]
+        self.batch_size = batch_size
+
+    def get_fields(self, header):
+        opts = self.model._meta
+        try:
+            fields = [opts.get_field(column) for column in header]
+        except Exception as error:
+            raise CommandError(f'{opts.db_table}: {error}')
+        defaults = [
+            field for field in opts.concrete_fields
+            if field not in fields and not field.primary_key
+        ]
+        return fields, defaults
+
+    def prepare(self, field, value):
+        if value == '' and field.null:
+            return None
+        return field.get_db_prep_save(field.to_python(value), self.connection)
+
+    def get_insert_sql(self, fields):
+        ops = self.connection.ops
+        columns = ', '.join(ops.quote_name(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        return (
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{ops.quote_name(self.model._meta.db_table)} ({columns}) '
+            f'VALUES ({placeholders}) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+
+    def check_foreign_keys(self, path, fields, batch, first_row):
+        """
+        CommandError с файлом и номером строки, если внешний ключ строки
+        пачки ссылается на несуществующую запись.
+        """
+        for idx, field in enumerate(fields):
+            if not field.many_to_one:
+                continue
+            values = {row[idx] for row in batch if row[idx] is not None}
+            target = field.target_field
+            existing = set(
+                field.related_model._base_manager.using(
+                    self.connection.alias
+                ).filter(**{f'{target.attname}__in': values}).values_list(
+                    target.attname, flat=True
+                )
+            )
+            for number, row in enumerate(batch, first_row):
+                if row[idx] is not None and row[idx] not in existing:
+                    raise CommandError(
+                        f'{path.name}, row {number}: {field.column}='
+                        f'{row[idx]} references a missing '
+                        f'{field.related_model._meta.db_table} row'
+                    )
+
+    def find_missing(self, fields, batch, first_row):
+        """
+        Номера строк пачки, которых нет в таблице после вставки: строку
+        отбросил конфликт уникального ограничения (другой id с тем же
+        slug, username...). Строки ищутся по первичному ключу из файла.
+        """
+        pk = self.model._meta.pk
+        if pk not in fields:
+            return []
+        idx = fields.index(pk)
+        existing = set(
+            self.model._base_manager.using(self.connection.alias).filter(
+                pk__in=[row[idx] for row in batch]
+            ).values_list('pk', flat=True)
+        )
+        return [number for number, row in enumerate(batch, first_row)
+                if row[idx] not in existing]
+
+    def check_constraints(self, path):
+        """Проверка ограничений загруженной таблицы средствами БД."""
+        try:
+            self.connection.check_constraints(
+                table_names=[self.model._meta.db_table]
+            )
+        except IntegrityError as error:
+            raise CommandError(f'{path.name}: {error}')
+
+    def read_batches(self, reader, fields, defaults):
+        default_values = tuple(
+            self.prepare(field, field.get_default()) for field in defaults
+        )
+        while True:
+            batch = [
+                tuple(
+                    self.prepare(field, row[idx])
+                    for idx, field in enumerate(fields)
+                ) + default_values
+                for row in islice(reader, self.batch_size)
+            ]
+            if not batch:
+                return
+            yield batch
+
+    def load(self, path, skip_rows=0, on_batch=None):
+        """
+        Загружает файл и возвращает число прочитанных строк.
+
+        skip_rows пропускает уже загруженные строки, on_batch вызывается
+        после каждой вставленной пачки с числом загруженных строк.
+        Номера строк этого запуска, которых после вставки нет в таблице,
+        сохраняются в self.missing.
+        """
+        self.missing = []
+        rows = skip_rows
+        with open(path, encoding='utf-8', newline='') as csv_file:
+            reader = csv.reader(csv_file)
+            header = next(reader)
+            fields, defaults = self.get_fields(header)
+            sql = self.get_insert_sql(fields + defaults)
+            for _ in islice(reader, skip_rows):
+                pass
+            for batch in self.read_batches(reader, fields, defaults):
+                with transaction.atomic(using=self.connection.alias):
+                    self.check_foreign_keys(path, fields, batch, rows + 1)
+                    with self.connection.cursor() as cursor:
+                        cursor.executemany(sql, batch)
+                    self.missing += self.find_missing(fields, batch, rows + 1)
+                rows += len(batch)
+                if on_batch is not None:
+                    on_batch(rows)
+        return rows
+
+    def reset_sequences(self):
+        """Сдвигает автоинкремент после вставки явных id (PostgreSQL)."""
+        statements = self.connection.ops.sequence_reset_sql(
+            no_style(), [self.model]
+        )
+        with self.connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+class Checkpoint:
+    """
+    Прогресс загрузки одного файла: число загруженных строк и признак
+    завершения. Если файл изменился (размер или mtime), прогресс
+    сбрасывается. Запись атомарна (временный файл + os.replace).
+    """
+
+    def __init__(self, directory, name, path):
+        self.file = Path(directory) / f'{name}.json'
+        stat = os.stat(path)
+        self.signature = [stat.st_size, stat.st_mtime_ns]
+
+    def load(self):
+        try:
+            with open(self.file) as checkpoint:
+                state = json.load(checkpoint)
+        except (FileNotFoundError, ValueError):
+            return {'rows': 0, 'done': False}
+        if state.get('signature') != self.signature:
+            return {'rows': 0, 'done': False}
+        return state
+
+    def save(self, rows, done=False):
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as checkpoint:
+            json.dump({'signature': self.signature, 'rows': rows,
+                       'done': done}, checkpoint)
+        os.replace(tmp_file, self.file)
+
+
+def import_table(name, options):
+    """
+    Загружает файл name.csv и возвращает (name, строк в файле, время,
+    номера строк, которых нет в таблице).
+
+    Функция верхнего уровня, чтобы её можно было запускать в процессах
+    ProcessPoolExecutor. Возвращает None, если файла нет; время равно
+    None, если файл уже загружен по данным checkpoint.
+    """
+    model = MODELS[name]
+    using = options['database']
+    connection = connections[using]
+    path = Path(options['path']) / f'{name}.csv'
+    if not path.exists():
+        return None
+    started = time.monotonic()
+
+    checkpoint = None
+    state = {'rows': 0, 'done': False}
+    if options['checkpoint_dir']:
+        checkpoint = Checkpoint(options['checkpoint_dir'], name, path)
+        state = checkpoint.load()
+    if state['done']:
+        return name, state['rows'], None, []
+
+    loader = CsvTableLoader(model, using, options['batch_size'])
+    indexes = model._meta.indexes if options['drop_indexes'] else []
+    with connection.schema_editor() as schema_editor:
+        for index in indexes:
+            schema_editor.remove_index(model, index)
+    try:
+        with connection.constraint_checks_disabled():
+            rows = loader.load(
+                path, skip_rows=state['rows'],
+                on_batch=checkpoint.save if checkpoint else None
+            )
+            # Проверки были отключены: до их включения БД сверяет
+            # ограничения всей таблицы, в том числе строк прошлых загрузок.
+            loader.check_constraints(path)
+    finally:
+        with connection.schema_editor() as schema_editor:
+            for index in indexes:
+                schema_editor.add_index(model, index)
+    loader.reset_sequences()
+    if checkpoint:
+        checkpoint.save(rows, done=True)
+    return name, rows, time.monotonic() - started, loader.missing
+
 
 class Command(BaseCommand):
     """
         Management-команда для импортирования csv-файлов из папки static/data/.
 
-        Из-за того, что файлы не подходят нынешней версии проекта,
-        импорт заточен под работу только с ними и для файлов нынешней версии
-        потребуется обновление команды.
+        Файлы читаются потоково пачками по --batch-size строк и загружаются
+        в базу DATABASES[--database] по этапам IMPORT_STAGES; каждая пачка
+        коммитится отдельно. С --workers N таблицы одного этапа грузятся
+        в N процессах. С --checkpoint-dir после каждой пачки сохраняется
+        число загруженных строк, и повторный запуск продолжает с этого
+        места. Флаг --drop-indexes снимает индексы Meta.indexes на время
+        загрузки и строит их заново после неё.
+
+        Каждая пачка сверяется с таблицей по первичным ключам строк файла:
+        в конце команда сообщает строки, которые не попали в базу.
     """
 
     help = 'Imports csv data to database'
 
-    def handle(self, *args, **kwargs):
-        con = sqlite3.connect('db.sqlite3')
-        cur = con.cursor()
-
-        for file in os.listdir('static/data/'):
-            to_db = []
-            fieldnames = []
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=str(settings.BASE_DIR / 'static' / 'data'),
+            help='Directory with csv files.'
+        )
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of processes for independent tables.'
+        )
+        parser.add_argument(
+            '--checkpoint-dir',
+            help='Directory for per-file progress to resume an import.'
+        )
+        parser.add_argument(
+            '--drop-indexes', action='store_true',
+            help='Drop Meta.indexes before loading and rebuild them after.'
+        )
 
-            print(file)
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        results = []
+        for stage in IMPORT_STAGES:
+            results.extend(self.run_stage(stage, options))
+        total = 0
+        for name, rows, elapsed, _ in results:
+            total += rows
+            if elapsed is None:
+                self.stdout.write(f'{name}: {rows} rows already imported')
+            else:
+                self.report(name, rows, elapsed)
+        self.report('total', total, time.monotonic() - started)
+        self.verify(results)
+        call_command('rebuild_ratings', database=options['database'],
+                     stdout=self.stdout)
+        call_command('rebuild_search_index', database=options['database'],
+                     stdout=self.stdout)
+        # Кэш ответов и ETag не должны пережить загрузку в обход API.
+        CacheVersion.objects.using(options['database']).bump_all()
 
-            with open('static/data/' + file) as fin:
-                file = file.replace('.csv', '')
-                if 'fieldnames' in VALID_DATA[file]:
-                    dr = csv.DictReader(
-                        fin,
-                        fieldnames=VALID_DATA[file]['fieldnames'],
-                        restval=''
-                    )
-                else:
-                    dr = csv.DictReader(fin, restval='')
-
-                for row in dr:
-                    tuple_row = ()
-                    values = ''
-                    for j in range(len(dr.fieldnames)):
-                        tuple_row += (row[f'{dr.fieldnames[j]}'],)
-                        values += '?,'
-                    if not (dr.line_num == 1 and 'order' in VALID_DATA[file]):
-                        if 'order' in VALID_DATA[file]:
-                            tuple_row = tuple(list(
-                                tuple_row[i] for i in VALID_DATA[file]['order']
-                            ))
-                        to_db.append(tuple_row)
-                    # else:
-                        # wrong_fields = list(tuple_row)
-                    tuple_row = ()
-
-            fieldnames = ', '.join(dr.fieldnames)
-            if 'fieldnames' not in VALID_DATA[file]:
-                fieldnames = ', '.join(dr.fieldnames).replace(
-                    'author', 'author_id'
-                )
+    def run_stage(self, stage, options):
+        if options['workers'] > 1 and len(stage) > 1:
+            # Дочерние процессы не должны делить соединения с родителем.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=min(options['workers'], len(stage))
+            ) as executor:
+                results = list(executor.map(
+                    import_table, stage, [options] * len(stage)
+                ))
+        else:
+            results = [import_table(name, options) for name in stage]
+        for name, result in zip(stage, results):
+            if result is None:
+                self.stdout.write(f'{name}: file not found, skipped')
+        return [result for result in results if result is not None]
 
-            cur.executemany(
-                f"INSERT OR IGNORE INTO {VALID_DATA[file]['table_name']}\
-                    ({fieldnames}) VALUES ({values[: -1]});",
-                to_db
+    def verify(self, results):
+        missing = []
+        for name, rows, _, numbers in results:
+            if numbers:
+                sample = ', '.join(map(str, numbers[:10]))
+                more = ', ...' if len(numbers) > 10 else ''
+                missing.append(f'{name}: {len(numbers)} of {rows} rows '
+                               f'not in db (rows {sample}{more})')
+        if missing:
+            raise CommandError(
+                'Row verification failed:\n' + '\n'.join(missing)
             )
-            to_db.clear()
-        con.commit()
-        con.close()
+
+    def report(self, name, rows, elapsed):
+        speed = rows / elapsed if elapsed else rows
+        self.stdout.write(
+            f'{name}: {rows} rows in {elapsed:.2f}s ({speed:.0f} rows/s)'
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Title, TitleReviewDay
+
+
+class Command(BaseCommand):
+    """
+        Management-команда для пересчёта хранимого рейтинга,
+        распределения оценок произведений и счётчиков отзывов по дням
+        для titles/trending/.
+
+        Нужна после загрузки отзывов в обход API (import_csv, админка).
+    """
+
+    help = 'Rebuilds stored title ratings from reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        database = options['database']
+        updated = Title.objects.using(database).rebuild_rating()
+        self.stdout.write(f'Updated titles: {updated}')
+        days = TitleReviewDay.objects.using(database).rebuild()
+        self.stdout.write(f'Title review days: {days}')
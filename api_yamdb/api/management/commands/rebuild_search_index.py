@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from reviews import search
+
+
+class Command(BaseCommand):
+    """
+        Management-команда для перестроения полнотекстового индекса
+        произведений (нужна после загрузки данных в обход ORM).
+    """
+
+    help = 'Rebuilds the title full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        search.rebuild(options['database'])
+        self.stdout.write('Search index rebuilt')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.mail import mail_queue
+
+
+class Command(BaseCommand):
+    """
+        Management-команда для отправки писем, оставшихся в OUTBOX
+        со статусом pending (например, после перезапуска сервиса).
+    """
+
+    help = 'Sends pending emails from the outbox'
+
+    def handle(self, *args, **kwargs):
+        sent = mail_queue.deliver_pending()
+        self.stdout.write(f'Sent emails: {sent}')
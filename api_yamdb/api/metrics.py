@@ -0,0 +1,313 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseForbidden
+
+from users.models import OutgoingEmail
+from .cache import response_cache
+from .mail import mail_queue
+from .profiling import ObservingMiddleware
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def get_config():
+    return getattr(settings, 'METRICS', {})
+
+
+def get_route(request):
+    """
+    Имя маршрута из urls.py (titles-list, reviews-detail...) вместо пути,
+    чтобы id в URL не плодили метки. Запросы мимо маршрутов
+    попадают в одну метку unmatched.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'unmatched'
+    return match.url_name
+
+
+class MetricsRegistry:
+    """
+    Счётчики и гистограммы запросов текущего процесса.
+
+    Запись — одна операция под блокировкой над словарями, поэтому
+    реестр безопасен для многопоточного WSGI-сервера. Чтобы метрики
+    нескольких процессов gunicorn собирались вместе, задайте
+    METRICS['MULTIPROCESS_DIR']: каждый процесс раз в FLUSH_INTERVAL
+    секунд сохраняет свой снимок в файл, а /metrics суммирует снимки
+    всех процессов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+        self.reset()
+
+    @property
+    def buckets(self):
+        return tuple(get_config().get('BUCKETS', DEFAULT_BUCKETS))
+
+    def reset(self):
+        with self._lock:
+            self._requests = Counter()
+            self._queries = Counter()
+            # Не накопительные значения по корзинам, последняя — +Inf.
+            self._latency = {}
+            self._latency_sum = Counter()
+
+    def observe_request(self, route, method, status, duration, queries):
+        buckets = self.buckets
+        idx = bisect_left(buckets, duration)
+        key = (route, method, str(status))
+        with self._lock:
+            self._requests[key] += 1
+            self._queries[(route, method)] += queries
+            if key not in self._latency:
+                self._latency[key] = [0] * (len(buckets) + 1)
+            self._latency[key][idx] += 1
+            self._latency_sum[key] += duration
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'buckets': list(self.buckets),
+                'requests': [[*key, value]
+                             for key, value in self._requests.items()],
+                'queries': [[*key, value]
+                            for key, value in self._queries.items()],
+                'latency': [[*key, list(counts), self._latency_sum[key]]
+                            for key, counts in self._latency.items()],
+                'cache': response_cache.stats(),
+                'email_queue': mail_queue.qsize(),
+            }
+
+    @property
+    def directory(self):
+        directory = get_config().get('MULTIPROCESS_DIR')
+        return Path(directory) if directory else None
+
+    def maybe_flush(self):
+        if self.directory is None:
+            return
+        now = time.monotonic()
+        if now - self._flushed_at < get_config().get('FLUSH_INTERVAL', 5):
+            return
+        self._flushed_at = now
+        self.flush()
+
+    def flush(self):
+        directory = self.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'metrics-{os.getpid()}.json'
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w') as snapshot_file:
+            json.dump(self.snapshot(), snapshot_file)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Снимки текущего процесса и процессов из MULTIPROCESS_DIR."""
+        snapshots = [self.snapshot()]
+        if self.directory is None or not self.directory.exists():
+            return snapshots
+        for path in self.directory.glob('metrics-*.json'):
+            try:
+                with open(path) as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                continue
+            if snapshot['pid'] == os.getpid():
+                continue
+            if not pid_alive(snapshot['pid']):
+                # Счётчики завершённых процессов сохраняются,
+                # а мгновенные значения — нет.
+                snapshot['email_queue'] = 0
+            snapshots.append(snapshot)
+        return snapshots
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю.
+        pass
+    return True
+
+
+def escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def labels(**values):
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in values.items()
+    ) + '}'
+
+
+def merge(snapshots):
+    """Суммирует снимки процессов."""
+    merged = {
+        'buckets': snapshots[0]['buckets'],
+        'requests': Counter(),
+        'queries': Counter(),
+        'latency': {},
+        'latency_sum': Counter(),
+        'hits': Counter(),
+        'misses': Counter(),
+        'email_queue': 0,
+    }
+    for snapshot in snapshots:
+        for *key, value in snapshot['requests']:
+            merged['requests'][tuple(key)] += value
+        for *key, value in snapshot['queries']:
+            merged['queries'][tuple(key)] += value
+        if snapshot['buckets'] == merged['buckets']:
+            for route, method, status, counts, total in snapshot['latency']:
+                key = (route, method, status)
+                latency = merged['latency'].setdefault(
+                    key, [0] * len(counts)
+                )
+                for idx, count in enumerate(counts):
+                    latency[idx] += count
+                merged['latency_sum'][key] += total
+        for namespace, stats in snapshot['cache'].items():
+            merged['hits'][namespace] += stats['hits']
+            merged['misses'][namespace] += stats['misses']
+        merged['email_queue'] += snapshot['email_queue']
+    return merged
+
+
+def header(name, kind, description):
+    return [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+
+
+def render_histogram(merged):
+    name = 'yamdb_http_request_duration_seconds'
+    lines = header(name, 'histogram', 'Request latency.')
+    for key, counts in sorted(merged['latency'].items()):
+        route, method, status = key
+        cumulative = 0
+        for bound, count in zip([*merged['buckets'], '+Inf'], counts):
+            cumulative += count
+            bucket_labels = labels(route=route, method=method,
+                                   status=status, le=bound)
+            lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+        route_labels = labels(route=route, method=method, status=status)
+        lines.append(f'{name}_sum{route_labels} '
+                     f'{merged["latency_sum"][key]:.6f}')
+        lines.append(f'{name}_count{route_labels} {cumulative}')
+    return lines
+
+
+def render_cache(merged):
+    hits, misses = merged['hits'], merged['misses']
+    namespaces = sorted(set(hits) | set(misses))
+    lines = header('yamdb_cache_requests_total', 'counter',
+                   'Response cache lookups.')
+    for namespace in namespaces:
+        for result, counter in (('hit', hits), ('miss', misses)):
+            lines.append('yamdb_cache_requests_total'
+                         f'{labels(namespace=namespace, result=result)} '
+                         f'{counter[namespace]}')
+    lines += header('yamdb_cache_hit_ratio', 'gauge',
+                    'Share of response cache hits.')
+    for namespace in namespaces:
+        total = hits[namespace] + misses[namespace]
+        ratio = hits[namespace] / total if total else 0
+        lines.append(f'yamdb_cache_hit_ratio{labels(namespace=namespace)} '
+                     f'{ratio:.4f}')
+    return lines
+
+
+def render(snapshots):
+    """Снимки процессов в текстовом формате Prometheus."""
+    merged = merge(snapshots)
+    lines = header('yamdb_http_requests_total', 'counter',
+                   'Total HTTP requests.')
+    for (route, method, status), value in sorted(merged['requests'].items()):
+        lines.append('yamdb_http_requests_total'
+                     f'{labels(route=route, method=method, status=status)} '
+                     f'{value}')
+    lines += render_histogram(merged)
+    lines += header('yamdb_db_queries_total', 'counter',
+                    'SQL queries executed by requests.')
+    for (route, method), value in sorted(merged['queries'].items()):
+        lines.append('yamdb_db_queries_total'
+                     f'{labels(route=route, method=method)} {value}')
+    lines += render_cache(merged)
+    lines += header('yamdb_email_queue_depth', 'gauge',
+                    'Emails waiting in worker queues.')
+    lines.append(f'yamdb_email_queue_depth {merged["email_queue"]}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryCounter:
+    """Наблюдатель, который только считает SQL-запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware(ObservingMiddleware):
+    """
+    Считает запросы, их латентность и число SQL-запросов по маршрутам.
+
+    Отключается настройкой METRICS['ENABLED'].
+    """
+    recorder_class = QueryCounter
+
+    def __init__(self, get_response):
+        if not get_config().get('ENABLED', True):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def finish(self, request, response, recorder, duration):
+        registry.observe_request(
+            get_route(request), request.method, response.status_code,
+            duration, recorder.count
+        )
+        return response
+
+
+def metrics_view(request):
+    """
+    Метрики в формате Prometheus.
+
+    Если задан METRICS['TOKEN'], требуется заголовок
+    Authorization: Bearer <TOKEN>.
+    """
+    token = get_config().get('TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    body = render(registry.collect())
+    pending = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.PENDING
+    ).count()
+    body += (
+        '# HELP yamdb_email_outbox_pending Emails pending in the outbox.\n'
+        '# TYPE yamdb_email_outbox_pending gauge\n'
+        f'yamdb_email_outbox_pending {pending}\n'
+    )
+    return HttpResponse(body, content_type=CONTENT_TYPE)
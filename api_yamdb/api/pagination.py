@@ -0,0 +1,45 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class FeedCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация лент отзывов и комментариев.
+
+    Страница выбирается по ключу (pub_date, id) без COUNT(*) и OFFSET,
+    поэтому время ответа не зависит от глубины страницы.
+    """
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+
+
+class FeedPagination(LimitOffsetPagination):
+    """
+    По умолчанию работает как LimitOffsetPagination.
+
+    Параметр ?cursor= (в том числе пустой для первой страницы)
+    переключает запрос на FeedCursorPagination.
+    """
+    cursor_pagination_class = FeedCursorPagination
+
+    def __init__(self):
+        self.cursor_pagination = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_query_param in request.query_params:
+            self.cursor_pagination = self.cursor_pagination_class()
+            return self.cursor_pagination.paginate_queryset(
+                queryset, request, view
+            )
+        self.cursor_pagination = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.to_html()
+        return super().to_html()
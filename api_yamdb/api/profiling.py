@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import re
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('api.profiling')
+slow_logger = logging.getLogger('api.profiling.slow')
+
+IN_LIST_RE = re.compile(r'\bIN \((?:%s, )*%s\)')
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+query_observers = ContextVar('query_observers', default=())
+
+
+def observe_queries(execute, sql, params, many, context):
+    """
+    Постоянный execute_wrapper соединения: передаёт запрос наблюдателям
+    из query_observers. Contextvar, в отличие от execute_wrapper
+    на соединении потока, виден и в потоках sync_to_async под ASGI.
+    """
+    for observer in query_observers.get():
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_observer(sender, connection, **kwargs):
+    if observe_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, observe_queries)
+
+
+@contextmanager
+def observing(observer):
+    """Передаёт observer все SQL-запросы внутри блока."""
+    token = query_observers.set(query_observers.get() + (observer,))
+    try:
+        yield observer
+    finally:
+        query_observers.reset(token)
+
+
+def fingerprint(sql):
+    """
+    Нормализует SQL: литералы и списки IN (%s, ...) заменяются
+    плейсхолдерами, чтобы запросы N+1 с разными id совпали.
+    """
+    sql = LITERAL_RE.sub('?', sql)
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+def get_view_name(request):
+    """
+    Имя обработчика запроса: ViewSet.action для роутера DRF,
+    View.method для APIView, иначе имя маршрута или функции.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view = match.func
+    view_class = getattr(view, 'cls', None)
+    method = request.method.lower()
+    if view_class is None:
+        return match.view_name or match._func_path
+    actions = getattr(view, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class QueryRecorder:
+    """execute_wrapper, собирающий число, время и отпечатки запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.durations = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            key = fingerprint(sql)
+            self.count += 1
+            self.duration += elapsed
+            self.fingerprints[key] += 1
+            self.durations[key] += elapsed
+
+    def duplicates(self, threshold):
+        return {sql: count for sql, count in self.fingerprints.most_common()
+                if count >= threshold}
+
+    def slowest(self, limit=5):
+        durations = sorted(self.durations.items(), key=itemgetter(1),
+                           reverse=True)
+        return durations[:limit]
+
+
+class ObservingMiddleware:
+    """
+    База middleware, которые собирают SQL-запросы каждого запроса
+    в recorder_class. Работает и в синхронном, и в асинхронном стеке.
+    """
+    sync_capable = True
+    async_capable = True
+    recorder_class = None
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Как в MiddlewareMixin: обработчик Django вызовет __call__
+            # как корутину и не займёт поток на время запроса.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with observing(self.recorder_class()) as recorder:
+            response = self.get_response(request)
+        return self.finish(request, response, recorder,
+                           time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with observing(self.recorder_class()) as recorder:
+            response = await self.get_response(request)
+        return self.finish(request, response, recorder,
+                           time.perf_counter() - started)
+
+    def finish(self, request, response, recorder, duration):
+        raise NotImplementedError
+
+
+class SQLProfilingMiddleware(ObservingMiddleware):
+    """
+    Профилирование SQL по запросам, включается настройкой SQL_PROFILING.
+
+    Для каждого запроса считаются число SQL-запросов, время в БД
+    и повторяющиеся запросы с одинаковым отпечатком (признак N+1).
+    Итог отдаётся заголовком Server-Timing и строкой лога api.profiling,
+    а запросы дольше SLOW_REQUEST_MS пишутся в лог api.profiling.slow
+    вместе с самыми долгими и повторяющимися запросами.
+    """
+    recorder_class = QueryRecorder
+
+    def __init__(self, get_response):
+        if not self.config.get('ENABLED', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @property
+    def config(self):
+        return getattr(settings, 'SQL_PROFILING', {})
+
+    def finish(self, request, response, recorder, duration):
+        total_ms = duration * 1000
+        db_ms = recorder.duration * 1000
+        duplicates = recorder.duplicates(
+            self.config.get('DUPLICATE_THRESHOLD', 3)
+        )
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={db_ms:.2f};desc="{recorder.count} queries"',
+            f'dup;desc="{sum(duplicates.values())} duplicate queries"',
+            f'app;dur={total_ms - db_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ))
+
+        record = {
+            'view': get_view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'duplicates': len(duplicates),
+        }
+        logger.info(
+            ' '.join(f'{key}={value}' for key, value in record.items()),
+            extra={'profile': record}
+        )
+        if duplicates:
+            logger.warning(
+                'Duplicate queries in %s: %s', record['view'],
+                '; '.join(f'{count}x {sql}'
+                          for sql, count in duplicates.items()),
+                extra={'profile': record}
+            )
+        if total_ms >= self.config.get('SLOW_REQUEST_MS', 500):
+            record['slowest'] = [
+                {'sql': sql, 'ms': round(duration * 1000, 2)}
+                for sql, duration in recorder.slowest()
+            ]
+            record['duplicate_queries'] = duplicates
+            slow_logger.warning(
+                'Slow request %s %s: %.0f ms, %s queries, %.0f ms in db',
+                request.method, request.path, total_ms, recorder.count,
+                db_ms, extra={'profile': record}
+            )
+        return response
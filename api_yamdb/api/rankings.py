@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from reviews.models import TitleReviewDay
+from .cache import response_cache
+
+
+def get_int_param(params, name, default, maximum):
+    """Целый параметр запроса от 1 до maximum, иначе ValidationError."""
+    value = params.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = 0
+    if not 1 <= value <= maximum:
+        raise ValidationError({name: [
+            f'Ожидается целое число от 1 до {maximum}.'
+        ]})
+    return value
+
+
+class RankingMixin:
+    """
+    Рейтинги произведений вьюсета:
+
+    - top/ — лучшие по оценке: ?score=bayes (по умолчанию, байесовская
+      оценка с априорными PRIOR_MEAN и PRIOR_WEIGHT из TITLE_RANKING)
+      или ?score=average (средняя оценка);
+    - trending/ — больше всего отзывов за ?days= последних дней.
+
+    Оба принимают фильтры списка (?category=, ?genre=...), ?limit=
+    и ?fields=; ответ — список произведений с полем score.
+    top/ читает колонки rating_avg и rating_bayes, которые отзывы
+    обновляют вместе с рейтингом: ORDER BY ... LIMIT идёт по индексу
+    и не зависит от размера каталога. trending/ суммирует счётчики
+    TitleReviewDay за окно дней, а не сами отзывы.
+    """
+    ranking_columns = {'bayes': 'rating_bayes', 'average': 'rating_avg'}
+
+    @cached_property
+    def ranking_limit(self):
+        ranking = settings.TITLE_RANKING
+        return get_int_param(self.request.query_params, 'limit',
+                             ranking['DEFAULT_LIMIT'], ranking['MAX_LIMIT'])
+
+    @cached_property
+    def ranking_column(self):
+        score = self.request.query_params.get('score', 'bayes')
+        if score not in self.ranking_columns:
+            raise ValidationError({'score': [
+                f'Ожидается одно из: {", ".join(self.ranking_columns)}.'
+            ]})
+        return self.ranking_columns[score]
+
+    @cached_property
+    def trending_window(self):
+        ranking = settings.TITLE_RANKING
+        days = get_int_param(self.request.query_params, 'days',
+                             ranking['TRENDING_DAYS'],
+                             ranking['MAX_TRENDING_DAYS'])
+        return TitleReviewDay.objects.filter(
+            day__gte=timezone.localdate() - timedelta(days=days - 1)
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'top':
+            return queryset.filter(**{
+                f'{self.ranking_column}__isnull': False
+            }).annotate(score=F(self.ranking_column))
+        if self.action == 'trending':
+            return queryset.annotate(score=Coalesce(Subquery(
+                self.trending_window.filter(
+                    title=OuterRef('pk')
+                ).order_by().values('title').annotate(
+                    total=Sum('reviews')
+                ).values('total')
+            ), 0))
+        return queryset
+
+    def get_cache_vary(self):
+        vary = super().get_cache_vary()
+        if self.action == 'trending':
+            # Окно trending/ сдвигается в полночь без записи в каталог.
+            vary = (*vary, timezone.localdate())
+        return vary
+
+    def is_filtered(self):
+        filterset_class = getattr(self, 'filterset_class', None)
+        return filterset_class is not None and bool(
+            filterset_class.base_filters.keys()
+            & self.request.query_params.keys()
+        )
+
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        return response_cache.get_or_set(
+            self.cache_namespace, request, lambda: self.get_ranking(
+                self.filter_queryset(self.get_queryset())
+            ), self.get_cache_vary()
+        )
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        return response_cache.get_or_set(
+            self.cache_namespace, request, self.get_trending,
+            self.get_cache_vary()
+        )
+
+    def get_trending(self):
+        titles = self.filter_queryset(self.get_queryset())
+        days = self.trending_window
+        if self.is_filtered():
+            days = days.filter(title__in=titles.values('pk'))
+        ids = days.values('title').annotate(total=Sum('reviews')).filter(
+            total__gt=0
+        ).order_by('-total', '-title').values_list('title', flat=True)
+        return self.get_ranking(titles.filter(pk__in=list(
+            ids[:self.ranking_limit]
+        )))
+
+    def get_ranking(self, queryset):
+        queryset = queryset.order_by('-score', '-pk')[:self.ranking_limit]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
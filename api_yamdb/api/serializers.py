@@ -4,7 +4,11 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 
-from reviews.models import Title, Category, Genre, Review, Comment
+from reviews import search
+from reviews.models import SCORES, Title, Category, Genre, Review, Comment
+from .bulk import BatchedSlugRelatedField, BulkListSerializer
+from .compiled import ValuesSerializer
+from .fieldsets import SparseFieldsetSerializerMixin
 
 
 User = get_user_model()
@@ -51,13 +55,15 @@ class SignUpSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class TokenSerializer(serializers.ModelSerializer):
+class TokenSerializer(serializers.Serializer):
+    """
+    Данные запроса токена. Обычный Serializer: у ModelSerializer
+    UniqueValidator поля username отклонял бы любого существующего
+    пользователя.
+    """
+    username = serializers.CharField(max_length=150)
     confirmation_code = serializers.CharField(required=True)
 
-    class Meta:
-        model = User
-        fields = ['username', 'confirmation_code']
-
     def validate_username(self, value):
         get_object_or_404(User, username=value)
         return value
@@ -71,6 +77,7 @@ class GenreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ('name', 'slug',)
+        list_serializer_class = BulkListSerializer
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -81,6 +88,14 @@ class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ('name', 'slug',)
+        list_serializer_class = BulkListSerializer
+
+
+class TitleBulkListSerializer(BulkListSerializer):
+    """bulk/ произведений: поисковый индекс обновляется на весь список."""
+
+    def saved(self, objects, using):
+        search.index_titles([obj.pk for obj in objects], using)
 
 
 class TitleSerializer(serializers.ModelSerializer):
@@ -90,22 +105,30 @@ class TitleSerializer(serializers.ModelSerializer):
     Метод validate проверяет, вышло ли произведение
     """
 
-    category = serializers.SlugRelatedField(
+    category = BatchedSlugRelatedField(
         queryset=Category.objects.all(),
         slug_field='slug'
     )
-    genre = serializers.SlugRelatedField(
+    genre = BatchedSlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
         many=True
     )
 
+    rating = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Title
-        fields = '__all__'
+        # Явный список: колонки рейтинга (rating_sum, score_N, rating_avg...)
+        # ведут отзывы, через API произведений они не пишутся
+        # и не отдаются.
+        fields = ('id', 'name', 'year', 'rating', 'description',
+                  'genre', 'category')
+        list_serializer_class = TitleBulkListSerializer
 
 
-class ReadOnlyTitleSerializer(serializers.ModelSerializer):
+class ReadOnlyTitleSerializer(SparseFieldsetSerializerMixin,
+                              serializers.ModelSerializer):
     rating = serializers.IntegerField(read_only=True)
     genre = GenreSerializer(many=True)
     category = CategorySerializer()
@@ -117,9 +140,98 @@ class ReadOnlyTitleSerializer(serializers.ModelSerializer):
             'rating', 'description',
             'genre', 'category'
         )
+        field_sources = {'rating': ('rating_sum', 'rating_count')}
+
+
+class CompiledTitleSerializer(ValuesSerializer):
+    """
+    Список произведений: тот же ответ, что у ReadOnlyTitleSerializer,
+    но из строк .values(). Жанры и категории страницы читаются
+    отдельными запросами по id, чтобы COUNT(*) пагинации шёл без JOIN.
+    """
+    field_order = ReadOnlyTitleSerializer.Meta.fields
+    columns = {
+        'rating': ('rating_sum', 'rating_count'),
+        'genre': ('id',),
+        'category': ('category_id',),
+    }
+
+    def prepare(self, rows):
+        self.genres, self.categories = {}, {}
+        if 'genre' in self.names:
+            genres = Genre.objects.filter(
+                genre__in=[row['id'] for row in rows]
+            ).values_list('genre', 'name', 'slug')
+            for title_id, name, slug in genres:
+                self.genres.setdefault(title_id, []).append(
+                    {'name': name, 'slug': slug}
+                )
+        if 'category' in self.names:
+            categories = Category.objects.filter(
+                id__in={row['category_id'] for row in rows}
+            ).values_list('id', 'name', 'slug')
+            self.categories = {
+                category_id: {'name': name, 'slug': slug}
+                for category_id, name, slug in categories
+            }
+
+    def render_rating(self, row):
+        if not row['rating_count']:
+            return None
+        return int(row['rating_sum'] / row['rating_count'])
+
+    def render_genre(self, row):
+        return self.genres.get(row['id'], [])
+
+    def render_category(self, row):
+        return self.categories.get(row['category_id'])
+
+
+class RankedTitleSerializer(CompiledTitleSerializer):
+    """
+    Произведение в рейтинге (titles/top/, titles/trending/): поля
+    списка и score — оценка или число отзывов за окно.
+    """
+    field_order = (*CompiledTitleSerializer.field_order, 'score')
+
+    def render_score(self, row):
+        return round(row['score'], 2)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class TitleBriefSerializer(serializers.ModelSerializer):
+    """Произведение внутри отзыва (?expand=title)."""
+
+    class Meta:
+        model = Title
+        fields = ('id', 'name', 'year')
+
+
+class TitleRatingsSerializer(SparseFieldsetSerializerMixin,
+                             serializers.ModelSerializer):
+    """
+    Распределение оценок произведения (titles/{id}/ratings/).
+    Строится из хранимых счётчиков произведения, отзывы не читаются.
+    """
+    rating = serializers.IntegerField(read_only=True)
+    average = serializers.FloatField(source='rating', read_only=True)
+    count = serializers.IntegerField(source='rating_count', read_only=True)
+    histogram = serializers.DictField(
+        source='score_histogram', child=serializers.IntegerField(),
+        read_only=True
+    )
+
+    class Meta:
+        model = Title
+        fields = ('id', 'rating', 'average', 'count', 'histogram')
+        field_sources = {
+            'rating': ('rating_sum', 'rating_count'),
+            'average': ('rating_sum', 'rating_count'),
+            'histogram': tuple(f'score_{score}' for score in SCORES),
+        }
+
+
+class ReviewSerializer(SparseFieldsetSerializerMixin,
+                       serializers.ModelSerializer):
     """Сериалайзер отзывов."""
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username',
@@ -129,18 +241,22 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = '__all__'
         model = Review
         read_only_fields = ('title', 'author')
+        expandable_fields = {'title': TitleBriefSerializer}
+
 
-    def validate(self, data):
-        if Review.objects.filter(
-            author=self.context['request'].user,
-            title_id=self.context['view'].kwargs.get('title_id')
-        ).exists() and self.context['request'].method == 'POST':
-            raise serializers.ValidationError(
-                'Нельзя оставить два отзыва на одно произведение.')
-        return data
+class ReviewBriefSerializer(serializers.ModelSerializer):
+    """Отзыв внутри комментария (?expand=review)."""
+    author = serializers.SlugRelatedField(
+        read_only=True, slug_field='username',
+    )
+
+    class Meta:
+        model = Review
+        fields = ('id', 'text', 'author', 'score', 'pub_date')
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetSerializerMixin,
+                        serializers.ModelSerializer):
     """Сериалайзер комментариев."""
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username'
@@ -150,3 +266,4 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = '__all__'
         model = Comment
         read_only_fields = ('review', 'author')
+        expandable_fields = {'review': ReviewBriefSerializer}
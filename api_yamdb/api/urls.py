@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework import routers
+
+from .async_views import async_urls
 from .views import (UserViewSet, SignUpAPIView,
                     TokenAPIView, GenreViewSet,
                     CategoryViewSet, TitleViewSet,
@@ -22,8 +25,13 @@ router.register(
 )
 
 
+v1_urls = router.urls
+if settings.API_ASYNC_VIEWS:
+    v1_urls = async_urls(v1_urls, (TitleViewSet, ReviewViewSet,
+                                   CommentViewSet))
+
 urlpatterns = [
-    path('v1/', include(router.urls)),
+    path('v1/', include(v1_urls)),
     path('v1/auth/signup/', SignUpAPIView.as_view(), name='signup'),
     path('v1/auth/token/', TokenAPIView.as_view(), name='token'),
 ]
@@ -2,26 +2,37 @@ import http
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, permissions, filters, mixins
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import AccessToken
 
 from api_yamdb import settings
+from api_yamdb.db import ReplicaReadMixin
+from .authentication import ClaimsAccessToken, revoke_user_claims
+from .bulk import BulkMixin
+from .cache import CachedListMixin, ConditionalGetMixin, response_cache
+from .fieldsets import SparseFieldsetMixin
 from .filters import TitlesFilter
+from .mail import mail_queue
+from .pagination import FeedPagination
+from .rankings import RankingMixin
 from .serializers import (UserSerializer, SignUpSerializer,
                           TokenSerializer, CategorySerializer,
                           GenreSerializer, TitleSerializer,
                           ReviewSerializer, CommentSerializer,
-                          ReadOnlyTitleSerializer)
+                          ReadOnlyTitleSerializer, CompiledTitleSerializer,
+                          TitleRatingsSerializer, RankedTitleSerializer)
 from .permissions import (IsAdmin, IsAdminOrReadOnly,
                           IsAuthorOrModeratorOrAdminOrReadOnly)
-from reviews.models import Category, Genre, Title, Review
+from reviews.models import Category, Genre, Title, Review, TitleReviewDay
 from django.shortcuts import get_object_or_404
 
 
@@ -35,6 +46,7 @@ class SignUpAPIView(APIView):
     письмо с кодом подтверждения (confirmation_code) на указанный адрес email.
 
     В конечном итоге должно формироваться и отправляться письмо.
+    Письмо ставится в очередь mail_queue, ответ не ждёт SMTP.
     """
 
     def post(self, *args, **kwargs):
@@ -47,10 +59,10 @@ class SignUpAPIView(APIView):
 
         confirmation_code = default_token_generator.make_token(user)
 
-        send_mail(subject='Подтверждение аккаунта',
-                  message=f'Код подтверждения: {confirmation_code}',
-                  from_email=settings.DEFAULT_FROM_EMAIL,
-                  recipient_list=[user.email])
+        mail_queue.send(subject='Подтверждение аккаунта',
+                        message=f'Код подтверждения: {confirmation_code}',
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        recipient_list=[user.email])
         return Response({'email': f'{email}',
                          'username': f'{username}'},
                         status=http.HTTPStatus.OK)
@@ -72,7 +84,7 @@ class TokenAPIView(APIView):
         user = User.objects.get(username=username)
 
         if default_token_generator.check_token(user, confirmation_code):
-            token = AccessToken.for_user(user)
+            token = ClaimsAccessToken.for_user(user)
             return Response({'token': str(token)},
                             status=http.HTTPStatus.CREATED)
         return Response({'confirmation_code': 'Invalid token!'},
@@ -86,6 +98,9 @@ class UserViewSet(viewsets.ModelViewSet):
 
     Доступен путь ".../me/" для авторизованного
     пользователя (GET, PATCH запросы).
+
+    Любое изменение или удаление пользователя отзывает claims
+    его выданных токенов (см. StatelessJWTAuthentication).
     """
 
     queryset = User.objects.all()
@@ -100,18 +115,35 @@ class UserViewSet(viewsets.ModelViewSet):
             detail=False,
             permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
-        serializer = UserSerializer(request.user)
+        user = get_object_or_404(User, pk=request.user.pk)
+        serializer = UserSerializer(user)
         if request.method == 'PATCH':
             serializer = UserSerializer(
-                request.user,
+                user,
                 data=request.data,
                 partial=True)
             serializer.is_valid(raise_exception=True)
-            serializer.save(role=request.user.role)
+            serializer.save(role=user.role)
+            revoke_user_claims(user.pk)
+            response_cache.invalidate('users')
         return Response(serializer.data)
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        revoke_user_claims(serializer.instance.pk)
+        response_cache.invalidate('users')
+
+    def perform_destroy(self, instance):
+        user_id = instance.pk
+        super().perform_destroy(instance)
+        revoke_user_claims(user_id)
+        # Отзывы пользователя удалены каскадом: рейтинги изменились.
+        response_cache.invalidate('users', 'titles')
 
-class GenreViewSet(viewsets.GenericViewSet,
+
+class GenreViewSet(BulkMixin,
+                   CachedListMixin,
+                   viewsets.GenericViewSet,
                    mixins.CreateModelMixin,
                    mixins.ListModelMixin,
                    mixins.DestroyModelMixin):
@@ -119,7 +151,8 @@ class GenreViewSet(viewsets.GenericViewSet,
     Класс позволяет просматривать модель Genre
     всем пользователям.
     Манипуляции с моделью Genre разрешены
-    исключительно администратору.
+    исключительно администратору, в том числе пачкой
+    через genres/bulk/ (создание и удаление по slug).
     """
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
@@ -128,9 +161,15 @@ class GenreViewSet(viewsets.GenericViewSet,
     pagination_class = LimitOffsetPagination
     search_fields = ('name',)
     lookup_field = 'slug'
+    cache_namespace = 'genres'
+    cache_invalidates = ('genres', 'titles')
+    bulk_actions = ('create', 'destroy')
+    bulk_lookup_field = 'slug'
 
 
-class CategoryViewSet(viewsets.GenericViewSet,
+class CategoryViewSet(BulkMixin,
+                      CachedListMixin,
+                      viewsets.GenericViewSet,
                       mixins.CreateModelMixin,
                       mixins.ListModelMixin,
                       mixins.DestroyModelMixin):
@@ -138,7 +177,8 @@ class CategoryViewSet(viewsets.GenericViewSet,
     Класс позволяет просматривать модель Category
     всем пользователям.
     Манипуляции с моделью Category разрешены
-    исключительно администратору.
+    исключительно администратору, в том числе пачкой
+    через categories/bulk/ (создание и удаление по slug).
     """
 
     queryset = Category.objects.all()
@@ -148,55 +188,145 @@ class CategoryViewSet(viewsets.GenericViewSet,
     pagination_class = LimitOffsetPagination
     search_fields = ('name',)
     lookup_field = 'slug'
+    cache_namespace = 'categories'
+    cache_invalidates = ('categories', 'titles')
+    bulk_actions = ('create', 'destroy')
+    bulk_lookup_field = 'slug'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ReplicaReadMixin, SparseFieldsetMixin, RankingMixin,
+                   BulkMixin, CachedListMixin, viewsets.ModelViewSet):
     """
     Класс позволяет просматривать модель Title
     всем пользователям.
     Манипуляции с моделью Title разрешены
-    исключительно администратору.
+    исключительно администратору, пачкой — через titles/bulk/.
+    Список и объект поддерживают ?fields= (см. SparseFieldsetMixin).
+    Список строится CompiledTitleSerializer из строк .values().
+    titles/{id}/ratings/ отдаёт распределение оценок из счётчиков
+    произведения одним запросом.
+    titles/top/ и titles/trending/ — рейтинги (см. RankingMixin).
     """
 
-    queryset = Title.objects.all().annotate(rating=Avg('reviews__score'))
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre')
     serializer_class = TitleSerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitlesFilter
     pagination_class = LimitOffsetPagination
     http_method_names = ['get', 'post', 'head', 'delete', 'patch']
+    cache_namespace = 'titles'
+    cache_invalidates = ('titles',)
+    bulk_lookup_field = 'id'
+    conditional_actions = ('list', 'retrieve', 'ratings', 'top')
+    fieldset_actions = ('list', 'retrieve', 'ratings', 'top', 'trending')
+
+    @action(detail=True, methods=['get'])
+    def ratings(self, request, pk=None):
+        serializer = self.get_serializer(self.get_object())
+        return Response(serializer.data)
+
+    def get_cache_invalidates(self):
+        # Отзывы удаляются вместе с произведением.
+        if self.action == 'destroy':
+            return (*self.cache_invalidates, f'reviews:{self.kwargs["pk"]}')
+        if self.action == 'bulk' and self.request.method == 'DELETE':
+            return (*self.cache_invalidates,
+                    *(f'reviews:{pk}' for pk in self.bulk_deleted))
+        return self.cache_invalidates
 
     def get_serializer_class(self):
-        if self.action in ("retrieve", "list"):
+        if self.action == 'list':
+            return CompiledTitleSerializer
+        if self.action == 'retrieve':
             return ReadOnlyTitleSerializer
+        if self.action == 'ratings':
+            return TitleRatingsSerializer
+        if self.action in ('top', 'trending'):
+            return RankedTitleSerializer
         return TitleSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    """Действия с отзывами"""
+class ReviewViewSet(ReplicaReadMixin, SparseFieldsetMixin,
+                    ConditionalGetMixin, viewsets.ModelViewSet):
+    """
+    Действия с отзывами.
+
+    Лента поддерживает ?fields= и ?expand=title (см. SparseFieldsetMixin),
+    автор читается тем же запросом через select_related.
+
+    Произведение загружается один раз за запрос (свойство title).
+    ETag ленты меняется при записи в отзывы этого произведения
+    или изменении пользователей (в ответе есть username автора).
+    Повторный отзыв отсекается ограничением `unique follow` в БД.
+    Создание и изменение отзыва в той же транзакции обновляют хранимый
+    рейтинг произведения и счётчик отзывов за день для titles/trending/;
+    удаление учитывает обработчик post_delete (reviews/signals.py).
+    """
     serializer_class = ReviewSerializer
     permission_classes = [
         IsAuthorOrModeratorOrAdminOrReadOnly,
         permissions.IsAuthenticatedOrReadOnly
     ]
-    pagination_class = LimitOffsetPagination
+    pagination_class = FeedPagination
+    fieldset_required = ('pub_date', 'title')
     http_method_names = ['get', 'post', 'delete',
                          'head', 'options', 'patch', 'trace']
 
+    def get_cache_namespaces(self):
+        return f'reviews:{self.kwargs.get("title_id")}', 'users'
+
+    def get_cache_invalidates(self):
+        return 'titles', f'reviews:{self.kwargs.get("title_id")}'
+
+    @cached_property
+    def title(self):
+        return get_object_or_404(Title, pk=self.kwargs.get('title_id'))
+
     def get_queryset(self):
-        return get_object_or_404(
-            Title, pk=self.kwargs.get('title_id')
-        ).reviews.all()
+        return self.title.reviews.all()
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(
-            author=self.request.user, title=title
-        )
-
+        try:
+            with transaction.atomic():
+                review = serializer.save(
+                    author=self.request.user, title=self.title
+                )
+                Title.objects.filter(pk=self.title.pk).update_rating(
+                    new_score=review.score
+                )
+                TitleReviewDay.objects.record(
+                    self.title.pk, timezone.localdate(review.pub_date), 1
+                )
+        except IntegrityError:
+            # Отзыв проверяется только после ошибки: успешная публикация
+            # не тратит на это запрос, а прочие ошибки БД не маскируются.
+            if not Review.objects.filter(
+                author=self.request.user, title=self.title
+            ).exists():
+                raise
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Нельзя оставить два отзыва на одно произведение.'
+            ]})
+
+    def perform_update(self, serializer):
+        old_score = serializer.instance.score
+        with transaction.atomic():
+            review = serializer.save()
+            Title.objects.filter(pk=review.title_id).update_rating(
+                old_score=old_score, new_score=review.score
+            )
+
+
+class CommentViewSet(ReplicaReadMixin, SparseFieldsetMixin,
+                     ConditionalGetMixin, viewsets.ModelViewSet):
+    """
+    Действия с комментариями.
 
-class CommentViewSet(viewsets.ModelViewSet):
-    """Действия с комментариями"""
+    Лента поддерживает ?fields= и ?expand=review (см. SparseFieldsetMixin).
+    """
     serializer_class = CommentSerializer
     http_method_names = ['get', 'post', 'delete', 'head',
                          'options', 'patch', 'trace']
@@ -204,20 +334,27 @@ class CommentViewSet(viewsets.ModelViewSet):
         IsAuthorOrModeratorOrAdminOrReadOnly,
         permissions.IsAuthenticatedOrReadOnly
     ]
-    pagination_class = LimitOffsetPagination
+    pagination_class = FeedPagination
+    fieldset_required = ('pub_date', 'review')
 
-    def get_queryset(self):
-        review = get_object_or_404(
+    def get_cache_namespaces(self):
+        return (f'comments:{self.kwargs.get("review_id")}',
+                f'reviews:{self.kwargs.get("title_id")}', 'users')
+
+    def get_cache_invalidates(self):
+        return (f'comments:{self.kwargs.get("review_id")}',)
+
+    @cached_property
+    def review(self):
+        return get_object_or_404(
             Review, pk=self.kwargs.get('review_id'),
             title_id=self.kwargs.get('title_id')
         )
-        return review.comments.all()
+
+    def get_queryset(self):
+        return self.review.comments.all()
 
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review, pk=self.kwargs.get('review_id'),
-            title_id=self.kwargs.get('title_id')
-        )
         serializer.save(
-            author=self.request.user, review=review
+            author=self.request.user, review=self.review
         )
@@ -0,0 +1,109 @@
+"""
+Настройки баз данных из переменных окружения и чтение с реплик.
+
+DB_ENGINE=sqlite (по умолчанию) или postgresql выбирает профиль,
+DB_REPLICAS — список реплик через запятую (файлы SQLite или
+host[:port] PostgreSQL). Реплики получают алиасы replica_1, replica_2...
+"""
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import ImproperlyConfigured
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+REPLICA_PREFIX = 'replica_'
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def split(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def get_sqlite_database(base_dir, environ):
+    default = {
+        'ENGINE': 'api_yamdb.db.sqlite3',
+        'NAME': environ.get('DB_NAME', base_dir / 'db.sqlite3'),
+        'CONN_MAX_AGE': int(environ.get('DB_CONN_MAX_AGE', 0)),
+        'OPTIONS': {
+            'transaction_mode': environ.get('DB_TRANSACTION_MODE',
+                                            'IMMEDIATE'),
+        },
+    }
+    replicas = [
+        dict(default, NAME=name) for name in split(environ.get('DB_REPLICAS'))
+    ]
+    return default, replicas
+
+
+def get_postgresql_database(environ):
+    pool_size = int(environ.get('DB_POOL_SIZE', 10))
+    default = {
+        # При DB_POOL_SIZE=0 используется стандартный бэкенд без пула.
+        'ENGINE': ('api_yamdb.db.postgresql' if pool_size
+                   else 'django.db.backends.postgresql'),
+        'NAME': environ.get('DB_NAME', 'yamdb'),
+        'USER': environ.get('DB_USER', 'yamdb'),
+        'PASSWORD': environ.get('DB_PASSWORD', ''),
+        'HOST': environ.get('DB_HOST', 'localhost'),
+        'PORT': environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(environ.get('DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'connect_timeout': int(environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
+        'POOL': {
+            'MIN_SIZE': int(environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': pool_size,
+            'TIMEOUT': int(environ.get('DB_POOL_TIMEOUT', 10)),
+        },
+    }
+    replicas = []
+    for address in split(environ.get('DB_REPLICAS')):
+        host, _, port = address.partition(':')
+        replicas.append(dict(default, HOST=host, PORT=port or default['PORT']))
+    return default, replicas
+
+
+def get_databases(base_dir, environ=os.environ):
+    """Значение settings.DATABASES для профиля DB_ENGINE."""
+    engine = environ.get('DB_ENGINE', 'sqlite')
+    if engine == 'sqlite':
+        default, replicas = get_sqlite_database(base_dir, environ)
+    elif engine == 'postgresql':
+        default, replicas = get_postgresql_database(environ)
+    else:
+        raise ImproperlyConfigured(
+            f'DB_ENGINE must be "sqlite" or "postgresql", got "{engine}".'
+        )
+    databases = {'default': default}
+    for idx, replica in enumerate(replicas, 1):
+        # В тестах реплика смотрит в тестовую базу default.
+        replica['TEST'] = {'MIRROR': 'default'}
+        databases[f'{REPLICA_PREFIX}{idx}'] = replica
+    return databases
+
+
+@contextmanager
+def use_replicas():
+    """Чтение внутри блока уходит на реплики (см. ReplicaRouter)."""
+    token = replica_reads.set(True)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+def pin_primary():
+    """До конца текущего блока use_replicas() читать с default."""
+    replica_reads.set(False)
+
+
+class ReplicaReadMixin:
+    """Безопасные запросы к представлению читают данные с реплик."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with use_replicas():
+            return super().dispatch(request, *args, **kwargs)
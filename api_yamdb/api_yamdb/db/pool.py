@@ -0,0 +1,49 @@
+"""
+Пул соединений процесса для бэкенда api_yamdb.db.postgresql.
+
+Не зависит от драйвера: соединения открывает переданная функция
+connect. Выдано может быть не больше max_size соединений; когда все
+заняты (например, потоками sync_to_async), getconn ждёт освобождения
+до timeout секунд и поднимает OperationalError Django.
+"""
+import threading
+
+from django.db import OperationalError
+
+
+class ConnectionPool:
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=10):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = [connect() for _ in range(min(min_size, max_size))]
+
+    def getconn(self):
+        """Свободное соединение из пула или новое, если свободных нет."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'Connection pool exhausted: all {self.max_size} '
+                f'connections are in use for {self.timeout}s.'
+            )
+        try:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop()
+            return self.connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection, close=False):
+        """Возвращает соединение в пул; close=True закрывает его."""
+        try:
+            if close:
+                connection.close()
+            else:
+                with self._lock:
+                    self._idle.append(connection)
+        finally:
+            self._slots.release()
@@ -0,0 +1,88 @@
+"""
+PostgreSQL с пулом соединений внутри процесса.
+
+Django открывает соединение на поток и держит его CONN_MAX_AGE секунд;
+здесь закрытие возвращает соединение в общий пул процесса
+(api_yamdb.db.pool.ConnectionPool), а открытие берёт его из пула.
+Перед выдачей соединение проверяется запросом SELECT 1, сломанные
+соединения закрываются и заменяются новыми. Размер пула задаётся
+ключом POOL: {'MIN_SIZE': 1, 'MAX_SIZE': 10, 'TIMEOUT': 10} настроек
+базы: если все MAX_SIZE соединений заняты, новое соединение ждёт
+освобождения TIMEOUT секунд, затем поднимается OperationalError.
+"""
+import os
+import threading
+
+import psycopg2
+import psycopg2.extras
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+
+from ..pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self, conn_params):
+        # Пул привязан к процессу: после fork соединения не переиспользуются.
+        key = (os.getpid(), self.alias)
+        with _pools_lock:
+            if key not in _pools:
+                options = self.settings_dict.get('POOL', {})
+                _pools[key] = ConnectionPool(
+                    lambda: psycopg2.connect(**conn_params),
+                    min_size=options.get('MIN_SIZE', 1),
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 10),
+                )
+            return _pools[key]
+
+    def checkout(self, pool):
+        """Берёт из пула рабочее соединение."""
+        while True:
+            connection = pool.getconn()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                connection.rollback()
+            except psycopg2.Error:
+                pool.putconn(connection, close=True)
+                continue
+            return connection
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        connection = self.checkout(self.get_pool(conn_params))
+        # Повторяет настройку из base.DatabaseWrapper.get_new_connection.
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = _pools.get((os.getpid(), self.alias))
+        with self.wrap_database_errors:
+            if pool is None:
+                return self.connection.close()
+            # Незавершённая транзакция откатывается, а закрытое
+            # или сломанное соединение убирается из пула.
+            close = bool(self.connection.closed)
+            if not close:
+                try:
+                    self.connection.rollback()
+                except psycopg2.Error:
+                    close = True
+            pool.putconn(self.connection, close=close)
@@ -0,0 +1,36 @@
+import random
+
+from django.conf import settings
+
+from . import REPLICA_PREFIX, replica_reads
+
+
+def get_replicas():
+    return [alias for alias in settings.DATABASES
+            if alias.startswith(REPLICA_PREFIX)]
+
+
+class ReplicaRouter:
+    """
+    Внутри use_replicas() чтение идёт на случайную реплику, запись
+    и чтение вне блока — на default. Реплики повторяют default,
+    поэтому связи между объектами разрешены, а миграции на репликах
+    не выполняются.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get():
+            return None
+        replicas = get_replicas()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db.startswith(REPLICA_PREFIX):
+            return False
+        return None
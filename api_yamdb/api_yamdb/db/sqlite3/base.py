@@ -0,0 +1,37 @@
+"""
+SQLite с настройками соединения и настраиваемым режимом транзакций.
+
+Каждое новое соединение настраивается по SQLITE_PRAGMAS: WAL позволяет
+читать во время записи отзыва, synchronous=NORMAL в режиме WAL
+не теряет целостность при сбое процесса, cache_size и mmap_size держат
+горячие страницы в памяти, а busy_timeout заставляет писателей ждать
+блокировку вместо ошибки «database is locked».
+
+OPTIONS['transaction_mode'] = 'IMMEDIATE' начинает atomic-блоки
+с BEGIN IMMEDIATE: блокировка записи берётся сразу и ожидается
+в пределах busy_timeout. С обычным BEGIN транзакция, которая сначала
+читает, а потом пишет, при конкурентной записи сразу падает с
+«database is locked», и busy_timeout не помогает.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+from django.utils.asyncio import async_unsafe
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('transaction_mode', None)
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
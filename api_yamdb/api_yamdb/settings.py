@@ -1,6 +1,9 @@
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from api_yamdb.db import get_databases
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.profiling.SQLProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,16 +68,51 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Асинхронные представления чтения произведений, отзывов и комментариев
+# (api/async_views.py); включаются в asgi.py.
+API_ASYNC_VIEWS = os.environ.get('API_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 
-DATABASES = {
+# Профиль задаётся переменными окружения (см. api_yamdb/db/__init__.py):
+# DB_ENGINE=postgresql, DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT,
+# DB_CONN_MAX_AGE, DB_POOL_SIZE, DB_REPLICAS.
+DATABASES = get_databases(BASE_DIR)
+
+DATABASE_ROUTERS = ['api_yamdb.db.router.ReplicaRouter']
+
+# Применяются к каждому новому соединению SQLite
+# (см. api_yamdb/db/sqlite3/base.py).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    # Отрицательное значение — размер в КиБ: 64 МиБ на соединение.
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
+
+# Сколько секунд после записи в коллекцию читать её с default,
+# пока реплики догоняют основную базу.
+DATABASE_REPLICA_LAG = int(os.environ.get('DB_REPLICA_LAG', 2))
+
+
+# Cache
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+API_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 60 * 5,
+}
+
 
 # Password validation
 
@@ -122,7 +162,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication'
+        'api.authentication.StatelessJWTAuthentication'
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
@@ -131,6 +171,22 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Наибольшее число объектов в запросе к bulk/ эндпоинтам (api/bulk.py).
+API_BULK_MAX_ITEMS = 1000
+
+# Рейтинги titles/top/ и titles/trending/ (api/rankings.py).
+# Байесовская оценка — (сумма + PRIOR_MEAN * PRIOR_WEIGHT) /
+# (количество + PRIOR_WEIGHT); после изменения PRIOR_* нужно выполнить
+# rebuild_ratings. Отзывы по дням хранятся за MAX_TRENDING_DAYS дней.
+TITLE_RANKING = {
+    'PRIOR_MEAN': 5.5,
+    'PRIOR_WEIGHT': 5,
+    'DEFAULT_LIMIT': 10,
+    'MAX_LIMIT': 100,
+    'TRENDING_DAYS': 7,
+    'MAX_TRENDING_DAYS': 30,
+}
+
 # JWT Token
 
 SIMPLE_JWT = {
@@ -138,9 +194,71 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Кэш token_version для StatelessJWTAuthentication (api/authentication.py).
+# Только общий для процессов кэш (Redis, Memcached). При None каждый
+# аутентифицированный запрос выполняет один SELECT token_version из
+# users_user по первичному ключу: пользователь из БД не загружается,
+# но отзыв claims без общего кэша иначе не увидят другие процессы.
+JWT_AUTH_CACHE = {
+    'ALIAS': None,
+    'TIMEOUT': 60,
+}
+
 # Email
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'django@example.com'
 
+EMAIL_QUEUE = {
+    'ASYNC': True,
+    'OUTBOX': True,
+    'WORKERS': 2,
+    'BATCH_SIZE': 50,
+    'BATCH_WAIT': 0.5,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,
+    'SENDING_TIMEOUT': 600,
+}
+
+# Profiling and metrics
+
+SQL_PROFILING = {
+    'ENABLED': False,
+    'SLOW_REQUEST_MS': 500,
+    'DUPLICATE_THRESHOLD': 3,
+}
+
+METRICS = {
+    'ENABLED': True,
+    # Каталог для снимков процессов gunicorn; None — только текущий процесс.
+    'MULTIPROCESS_DIR': None,
+    'FLUSH_INTERVAL': 5,
+    'TOKEN': None,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'slow_requests': {
+            'class': 'logging.FileHandler',
+            'filename': BASE_DIR / 'slow_requests.log',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'api.profiling.slow': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+        },
+    },
+}
+
 DEFAULT_MAX_LENGTH_TEXT_MESSAGE = 10
@@ -0,0 +1,61 @@
+# Generated by Django 3.2 on 2026-10-18 17:20
+
+from django.db import migrations
+
+# SQL записан в миграции, а не берётся из reviews.search: миграция
+# должна создавать тот индекс, который был на момент её написания.
+FTS_TABLE = 'reviews_title_fts'
+SEARCH_VECTOR = 'search_vector'
+
+
+def install_search(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                    "USING fts5(name, description, tokenize='unicode61')"
+                )
+            except Exception:
+                # SQLite без FTS5: поиск работает через icontains.
+                return
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, name, description) '
+                'SELECT id, name, description FROM reviews_title'
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'ALTER TABLE reviews_title ADD COLUMN IF NOT EXISTS '
+                f'{SEARCH_VECTOR} tsvector GENERATED ALWAYS AS '
+                "(to_tsvector('simple', coalesce(name, '') || ' ' || "
+                "coalesce(description, ''))) STORED"
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS reviews_title_search_gin '
+                f'ON reviews_title USING GIN ({SEARCH_VECTOR})'
+            )
+
+
+def uninstall_search(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'ALTER TABLE reviews_title DROP COLUMN IF EXISTS '
+                f'{SEARCH_VECTOR}'
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_rating'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+# Индексы под запросы списков отзывов, комментариев и фильтров
+# произведений. Идёт после 0004_title_search по dependencies, хотя
+# время в заголовке 0004 позже: порядок задают только зависимости.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_title_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['review', '-pub_date', '-id'], name='comment_review_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['title', '-pub_date', '-id'], name='review_title_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year'], name='title_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year'], name='title_category_year_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 3.2 on 2026-10-18 17:38
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Value
+from django.db.models.functions import Cast, NullIf, TruncDate
+from django.utils import timezone
+
+
+def fill_rankings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    TitleReviewDay = apps.get_model('reviews', 'TitleReviewDay')
+    ranking = settings.TITLE_RANKING
+    rating_sum = Cast(F('rating_sum'), FloatField())
+    rating_count = NullIf(F('rating_count'), Value(0))
+    Title.objects.update(
+        rating_avg=ExpressionWrapper(
+            rating_sum / rating_count, output_field=FloatField()
+        ),
+        rating_bayes=ExpressionWrapper(
+            (rating_sum + ranking['PRIOR_MEAN'] * ranking['PRIOR_WEIGHT'])
+            / (rating_count + ranking['PRIOR_WEIGHT']),
+            output_field=FloatField()
+        )
+    )
+    since = timezone.localdate() - timedelta(
+        days=ranking['MAX_TRENDING_DAYS'] - 1
+    )
+    days = Review.objects.filter(
+        pub_date__date__gte=since
+    ).order_by().values('title', day=TruncDate('pub_date')).annotate(
+        total=Count('pk')
+    )
+    TitleReviewDay.objects.bulk_create([
+        TitleReviewDay(title_id=row['title'], day=row['day'],
+                       reviews=row['total'])
+        for row in days
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_score_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleReviewDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('reviews', models.IntegerField(default=0, verbose_name='Отзывов')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_avg',
+            field=models.FloatField(null=True, verbose_name='Средняя оценка'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_bayes',
+            field=models.FloatField(null=True, verbose_name='Байесовская оценка'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['rating_avg'], name='title_rating_avg_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['rating_bayes'], name='title_rating_bayes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'rating_avg'], name='title_category_avg_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'rating_bayes'], name='title_category_bayes_idx'),
+        ),
+        migrations.AddField(
+            model_name='titlereviewday',
+            name='title',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_days', to='reviews.title', verbose_name='Произведение'),
+        ),
+        migrations.AddIndex(
+            model_name='titlereviewday',
+            index=models.Index(fields=['day'], name='title_review_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='titlereviewday',
+            constraint=models.UniqueConstraint(fields=('title', 'day'), name='unique title day'),
+        ),
+        migrations.RunPython(fill_rankings, migrations.RunPython.noop),
+    ]
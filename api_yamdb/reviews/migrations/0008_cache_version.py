@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_rankings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Пространство имён')),
+                ('version', models.BigIntegerField(verbose_name='Версия')),
+                ('modified', models.DateTimeField(verbose_name='Изменено')),
+            ],
+        ),
+    ]
@@ -1,4 +1,12 @@
-from django.db import models
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import (ExpressionWrapper, F, FloatField, OuterRef,
+                              Subquery, Count, Sum, Value)
+from django.db.models.functions import Cast, Coalesce, NullIf, TruncDate
+from django.utils import timezone
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth import get_user_model
 
@@ -6,6 +14,9 @@ from api_yamdb.settings import DEFAULT_MAX_LENGTH_TEXT_MESSAGE
 
 User = get_user_model()
 
+# Допустимые оценки; для каждой у произведения хранится счётчик score_<N>.
+SCORES = range(1, 11)
+
 
 class Genre(models.Model):
     name = models.CharField(max_length=256)
@@ -23,6 +34,82 @@ class Category(models.Model):
         return self.name
 
 
+def ranking_scores(rating_sum, rating_count):
+    """
+    Выражения для rating_avg и rating_bayes по выражениям суммы
+    и количества оценок. Без оценок обе колонки — NULL.
+    """
+    ranking = settings.TITLE_RANKING
+    rating_sum = Cast(rating_sum, FloatField())
+    rating_count = NullIf(rating_count, Value(0))
+    return {
+        'rating_avg': ExpressionWrapper(
+            rating_sum / rating_count, output_field=FloatField()
+        ),
+        'rating_bayes': ExpressionWrapper(
+            (rating_sum + ranking['PRIOR_MEAN'] * ranking['PRIOR_WEIGHT'])
+            / (rating_count + ranking['PRIOR_WEIGHT']),
+            output_field=FloatField()
+        ),
+    }
+
+
+class TitleQuerySet(models.QuerySet):
+    """
+    Поддержка хранимого рейтинга произведений.
+
+    Сумма, количество оценок, счётчики score_<N> гистограммы
+    и оценки для рейтингов (rating_avg, rating_bayes) меняются одним
+    UPDATE через F-выражения, поэтому параллельные отзывы не теряют
+    изменения друг друга.
+    """
+
+    def update_rating(self, old_score=None, new_score=None):
+        """
+        Учитывает изменение оценки: old_score снимается,
+        new_score добавляется.
+        """
+        score_delta = (new_score or 0) - (old_score or 0)
+        count_delta = (new_score is not None) - (old_score is not None)
+        if not score_delta and not count_delta:
+            return 0
+        buckets = {}
+        if old_score is not None:
+            buckets[f'score_{old_score}'] = F(f'score_{old_score}') - 1
+        if new_score is not None:
+            buckets[f'score_{new_score}'] = F(f'score_{new_score}') + 1
+        return self.update(
+            rating_sum=F('rating_sum') + score_delta,
+            rating_count=F('rating_count') + count_delta,
+            **buckets,
+            **ranking_scores(F('rating_sum') + score_delta,
+                             F('rating_count') + count_delta)
+        )
+
+    def rebuild_rating(self):
+        """Пересчитывает рейтинг и гистограмму по таблице отзывов."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+
+        def count(reviews):
+            return Coalesce(Subquery(
+                reviews.annotate(total=Count('pk')).values('total')
+            ), 0)
+
+        updated = self.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0
+            ),
+            rating_count=count(reviews),
+            **{f'score_{score}': count(reviews.filter(score=score))
+               for score in SCORES}
+        )
+        self.update(**ranking_scores(F('rating_sum'), F('rating_count')))
+        return updated
+
+
 class Title(models.Model):
     name = models.TextField(max_length=200)
     year = models.IntegerField()
@@ -35,11 +122,106 @@ class Title(models.Model):
     )
     genre = models.ManyToManyField(Genre, related_name='genre', blank=True)
     description = models.TextField(max_length=200)
+    rating_sum = models.PositiveIntegerField('Сумма оценок', default=0)
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок', default=0
+    )
+    score_1 = models.PositiveIntegerField('Оценок 1', default=0)
+    score_2 = models.PositiveIntegerField('Оценок 2', default=0)
+    score_3 = models.PositiveIntegerField('Оценок 3', default=0)
+    score_4 = models.PositiveIntegerField('Оценок 4', default=0)
+    score_5 = models.PositiveIntegerField('Оценок 5', default=0)
+    score_6 = models.PositiveIntegerField('Оценок 6', default=0)
+    score_7 = models.PositiveIntegerField('Оценок 7', default=0)
+    score_8 = models.PositiveIntegerField('Оценок 8', default=0)
+    score_9 = models.PositiveIntegerField('Оценок 9', default=0)
+    score_10 = models.PositiveIntegerField('Оценок 10', default=0)
+    rating_avg = models.FloatField('Средняя оценка', null=True)
+    rating_bayes = models.FloatField('Байесовская оценка', null=True)
+
+    objects = TitleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['year'], name='title_year_idx'),
+            models.Index(
+                fields=['category', 'year'], name='title_category_year_idx'
+            ),
+            models.Index(fields=['rating_avg'], name='title_rating_avg_idx'),
+            models.Index(
+                fields=['rating_bayes'], name='title_rating_bayes_idx'
+            ),
+            models.Index(
+                fields=['category', 'rating_avg'],
+                name='title_category_avg_idx'
+            ),
+            models.Index(
+                fields=['category', 'rating_bayes'],
+                name='title_category_bayes_idx'
+            ),
+        ]
+
+    @property
+    def rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @property
+    def score_histogram(self):
+        """Количество оценок по значениям: {1: ..., 10: ...}."""
+        return {score: getattr(self, f'score_{score}') for score in SCORES}
 
     def __str__(self):
         return self.name
 
 
+class TitleReviewDayQuerySet(models.QuerySet):
+    """Число отзывов на произведения по дням для titles/trending/."""
+
+    def record(self, title_id, day, delta):
+        """
+        Прибавляет delta к счётчику отзывов произведения за день.
+        Новый счётчик заодно удаляет счётчики старше окна хранения.
+        """
+        bucket = self.filter(title_id=title_id, day=day)
+        if bucket.update(reviews=F('reviews') + delta) or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                self.create(title_id=title_id, day=day, reviews=delta)
+        except IntegrityError:
+            # Счётчик за этот день создал параллельный запрос.
+            bucket.update(reviews=F('reviews') + delta)
+        else:
+            self.prune()
+
+    def kept_since(self):
+        """Первый день окна хранения: MAX_TRENDING_DAYS дней до сегодня."""
+        return timezone.localdate() - timedelta(
+            days=settings.TITLE_RANKING['MAX_TRENDING_DAYS'] - 1
+        )
+
+    def prune(self):
+        """Удаляет счётчики старше MAX_TRENDING_DAYS дней."""
+        return self.filter(day__lt=self.kept_since()).delete()[0]
+
+    def rebuild(self):
+        """Пересчитывает счётчики за MAX_TRENDING_DAYS дней по отзывам."""
+        since = self.kept_since()
+        days = Review.objects.using(self.db).filter(
+            pub_date__date__gte=since
+        ).order_by().values('title', day=TruncDate('pub_date')).annotate(
+            total=Count('pk')
+        )
+        self.all().delete()
+        return len(self.bulk_create([
+            self.model(title_id=row['title'], day=row['day'],
+                       reviews=row['total'])
+            for row in days
+        ]))
+
+
 class Review(models.Model):
     """Модель отзывов."""
     author = models.ForeignKey(
@@ -61,8 +243,13 @@ class Review(models.Model):
     score = models.PositiveSmallIntegerField(
         'Оценка произведения',
         validators=[
-            MinValueValidator(1, message='Оценка должна быть не меньше 1.'),
-            MaxValueValidator(10, message='Оценка должна быть не больше 10.')
+            MinValueValidator(
+                SCORES[0], message=f'Оценка должна быть не меньше {SCORES[0]}.'
+            ),
+            MaxValueValidator(
+                SCORES[-1],
+                message=f'Оценка должна быть не больше {SCORES[-1]}.'
+            )
         ],
     )
 
@@ -72,6 +259,12 @@ class Review(models.Model):
                 fields=['author', 'title'], name='unique follow',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx'
+            ),
+        ]
         ordering = ['-pub_date']
 
     def __str__(self) -> str:
@@ -98,6 +291,113 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:DEFAULT_MAX_LENGTH_TEXT_MESSAGE]
+
+
+class TitleReviewDay(models.Model):
+    """
+    Сколько отзывов получило произведение за день. Счётчики меняются
+    вместе с отзывами, titles/trending/ суммирует их за окно дней.
+    """
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='review_days',
+        verbose_name='Произведение',
+    )
+    day = models.DateField('День')
+    reviews = models.IntegerField('Отзывов', default=0)
+
+    objects = TitleReviewDayQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'day'], name='unique title day',
+            )
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='title_review_day_idx'),
+        ]
+
+
+class CacheVersionQuerySet(models.QuerySet):
+    """Версии пространств имён кэша ответов (см. api.cache)."""
+
+    def primary(self):
+        # Версии читаются с основной базы: отстающая реплика вернула бы
+        # старую версию и вместе с ней устаревший ответ 304. База,
+        # выбранная явно через using(), сохраняется.
+        if self._db is not None:
+            return self
+        return self.using(router.db_for_write(self.model))
+
+    def bump_all(self, now=None):
+        """
+        Увеличивает версии всех пространств имён: данные загружены
+        в обход API, и любой закэшированный ответ может быть устаревшим.
+        """
+        return self.primary().update(version=F('version') + 1,
+                                     modified=now or timezone.now())
+
+    def bump(self, namespaces, now=None):
+        """Увеличивает версии и время изменения пространств имён."""
+        now = now or timezone.now()
+        updated = self.primary().filter(name__in=namespaces).update(
+            version=F('version') + 1, modified=now
+        )
+        if updated < len(namespaces):
+            self.create_missing(namespaces, now)
+
+    def create_missing(self, namespaces, now):
+        # Версия начинается с текущего времени: ответы, закэшированные
+        # до пересоздания строки (например, после очистки базы),
+        # под новой версией не найдутся.
+        self.primary().bulk_create([
+            self.model(name=name, version=time.time_ns(), modified=now)
+            for name in namespaces
+        ], ignore_conflicts=True)
+
+    def get_state(self, namespaces):
+        """{пространство имён: (версия, время изменения)} одним запросом."""
+        state = self._read(namespaces)
+        if len(state) < len(namespaces):
+            self.create_missing(
+                [name for name in namespaces if name not in state],
+                timezone.now()
+            )
+            state = self._read(namespaces)
+        return state
+
+    def _read(self, namespaces):
+        return {
+            name: (version, modified.timestamp())
+            for name, version, modified in self.primary().filter(
+                name__in=namespaces
+            ).values_list('name', 'version', 'modified')
+        }
+
+
+class CacheVersion(models.Model):
+    """
+    Версия пространства имён кэша ответов. Хранится в базе, а не в кэше:
+    ETag, Last-Modified и ключи кэша одинаковы во всех процессах
+    и не теряются при вытеснении.
+    """
+    name = models.CharField('Пространство имён', max_length=64,
+                            primary_key=True)
+    version = models.BigIntegerField('Версия')
+    modified = models.DateTimeField('Изменено')
+
+    objects = CacheVersionQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
@@ -0,0 +1,138 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'reviews_title_fts'
+SEARCH_VECTOR = 'search_vector'
+TOKEN_RE = re.compile(r'\w+')
+
+SQLITE_FILL_SQL = (
+    f'INSERT INTO {FTS_TABLE}(rowid, name, description) '
+    'SELECT id, name, description FROM reviews_title'
+)
+
+_available = {}
+
+
+def is_available(connection):
+    """
+    Есть ли в базе полнотекстовый индекс произведений.
+
+    Проверяется один раз на базу (alias) и заново после migrate
+    (см. reset): индекс создаётся миграцией и может отсутствовать,
+    если SQLite собран без FTS5.
+    """
+    if connection.alias not in _available:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = %s",
+                    [FTS_TABLE]
+                )
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT 1 FROM information_schema.columns '
+                    'WHERE table_name = %s AND column_name = %s',
+                    ['reviews_title', SEARCH_VECTOR]
+                )
+            else:
+                _available[connection.alias] = False
+                return False
+            _available[connection.alias] = cursor.fetchone() is not None
+    return _available[connection.alias]
+
+
+def reset(using='default'):
+    """Сбрасывает результат is_available; вызывается после migrate."""
+    _available.pop(using, None)
+
+
+def rebuild(using='default'):
+    """Перестраивает индекс SQLite (в PostgreSQL колонка вычисляемая)."""
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and is_available(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(SQLITE_FILL_SQL)
+
+
+def index_title(title, using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [title.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, description) '
+            'VALUES (%s, %s, %s)',
+            [title.pk, title.name, title.description]
+        )
+
+
+def index_titles(pks, using='default'):
+    """
+    Обновляет индекс SQLite для произведений pks двумя запросами
+    на весь список — для bulk-записи, которая обходит save().
+    """
+    connection = connections[using]
+    pks = list(pks)
+    if (not pks or connection.vendor != 'sqlite'
+            or not is_available(connection)):
+        return
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', pks
+        )
+        cursor.execute(
+            f'{SQLITE_FILL_SQL} WHERE id IN ({placeholders})', pks
+        )
+
+
+def unindex_title(title, using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [title.pk])
+
+
+def search_titles(queryset, query):
+    """
+    Фильтрует произведения по словам из query и сортирует по релевантности.
+
+    Каждое слово ищется как префикс, все слова должны встретиться
+    в названии или описании. Без полнотекстового индекса используется
+    icontains по названию.
+    """
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return queryset
+    connection = connections[queryset.db]
+    if not is_available(connection):
+        return queryset.filter(name__icontains=query)
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # rank считается подзапросом по rowid только для найденных строк
+        # и только для сортировки: COUNT пагинации его не вычисляет.
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        )).order_by(RawSQL(
+            f'SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = {table}.id',
+            [match]
+        ).asc(), 'id')
+    tsquery = ' & '.join(f'{token}:*' for token in tokens)
+    return queryset.annotate(search_match=RawSQL(
+        f"{table}.{SEARCH_VECTOR} @@ to_tsquery('simple', %s)",
+        [tsquery], output_field=BooleanField()
+    )).filter(search_match=True).order_by(RawSQL(
+        f"ts_rank({table}.{SEARCH_VECTOR}, to_tsquery('simple', %s))",
+        [tsquery], output_field=FloatField()
+    ).desc(), 'id')
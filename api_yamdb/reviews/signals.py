@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import search
+from .models import Review, Title, TitleReviewDay
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, using, **kwargs):
+    search.index_title(instance, using)
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, using, **kwargs):
+    search.unindex_title(instance, using)
+
+
+@receiver(post_migrate)
+def reset_search(sender, using, **kwargs):
+    """Миграция могла создать или удалить индекс: проверить его заново."""
+    search.reset(using)
+
+
+@receiver(post_delete, sender=Review)
+def unrate_review(sender, instance, **kwargs):
+    """
+    Снимает оценку удалённого отзыва с хранимого рейтинга произведения
+    и счётчика отзывов за день. Срабатывает при любом удалении, в том
+    числе каскадном — вместе с автором или произведением.
+    """
+    Title.objects.filter(pk=instance.title_id).update_rating(
+        old_score=instance.score
+    )
+    TitleReviewDay.objects.record(
+        instance.title_id, timezone.localdate(instance.pub_date), -1
+    )
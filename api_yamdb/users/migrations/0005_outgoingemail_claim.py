@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_tokenuser'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingemail',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взято в отправку'),
+        ),
+        migrations.AlterField(
+            model_name='outgoingemail',
+            name='status',
+            field=models.CharField(choices=[('pending', 'pending'), ('sending', 'sending'), ('sent', 'sent'), ('failed', 'failed')], db_index=True, default='pending', max_length=16, verbose_name='Статус'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_outgoingemail_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Увеличивается, когда claims выданных токенов устаревают.', verbose_name='Версия токенов'),
+        ),
+    ]
@@ -53,6 +53,11 @@ class User(AbstractUser):
         max_length=40,
         blank=True
     )
+    token_version = models.PositiveIntegerField(
+        verbose_name='Версия токенов',
+        default=0,
+        help_text='Увеличивается, когда claims выданных токенов устаревают.'
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -68,3 +73,83 @@ class User(AbstractUser):
 
     def __str__(self) -> str:
         return self.username
+
+
+class TokenUser(User):
+    """
+    Пользователь, восстановленный из claims JWT без запроса к БД.
+
+    Содержит только id, username, role, is_staff и is_superuser,
+    поэтому сохранять или удалять его запрещено.
+    """
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise NotImplementedError('TokenUser cannot be saved.')
+
+    def delete(self, *args, **kwargs):
+        raise NotImplementedError('TokenUser cannot be deleted.')
+
+
+class OutgoingEmail(models.Model):
+    """
+    Письмо в очереди на отправку.
+
+    Хранит статус доставки, число попыток и последнюю ошибку,
+    чтобы неотправленные письма переживали перезапуск сервиса.
+    Перед отправкой письмо переводится из pending в sending одним
+    условным UPDATE, поэтому его отправляет только один поток или процесс.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUSES = (
+        (PENDING, 'pending'),
+        (SENDING, 'sending'),
+        (SENT, 'sent'),
+        (FAILED, 'failed'),
+    )
+
+    subject = models.CharField(verbose_name='Тема', max_length=255)
+    body = models.TextField(verbose_name='Текст письма')
+    from_email = models.EmailField(verbose_name='Отправитель', max_length=254)
+    to = models.TextField(verbose_name='Получатели')
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+        db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток отправки',
+        default=0
+    )
+    last_error = models.TextField(verbose_name='Последняя ошибка', blank=True)
+    created = models.DateTimeField(verbose_name='Создано', auto_now_add=True)
+    claimed_at = models.DateTimeField(
+        verbose_name='Взято в отправку',
+        null=True,
+        blank=True
+    )
+    sent_at = models.DateTimeField(
+        verbose_name='Отправлено',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ['created']
+
+    @property
+    def recipients(self) -> list:
+        return self.to.split(',')
+
+    def __str__(self) -> str:
+        return f'{self.subject} -> {self.to}'
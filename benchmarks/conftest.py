@@ -0,0 +1,163 @@
+import json
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks.factory import Volumes, seed
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench-users', type=int, default=200)
+    group.addoption('--bench-titles', type=int, default=1000)
+    group.addoption('--bench-reviews', type=int, default=10,
+                    help='Reviews per title.')
+    group.addoption('--bench-comments', type=int, default=2,
+                    help='Comments per review.')
+    group.addoption('--bench-rounds', type=int, default=30,
+                    help='Timed requests per route.')
+    group.addoption('--bench-cache', action='store_true',
+                    help='Keep the response cache enabled.')
+    group.addoption('--bench-json', default=None,
+                    help='Results file, benchmarks/results/<commit>.json '
+                         'by default.')
+    group.addoption('--bench-compare', default=None,
+                    help='Previous results file to compare with.')
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class BenchmarkRecorder:
+    """
+    Замеряет маршрут: один прогрев, подсчёт SQL-запросов на одном
+    вызове и rounds вызовов с замером времени (p50/p95/mean в мс).
+    request может вернуть и не HTTP-ответ (микробенчмарки), тогда
+    статус не сохраняется.
+    """
+
+    def __init__(self, rounds):
+        self.rounds = rounds
+        self.results = {}
+
+    def __call__(self, name, request):
+        request()
+        with CaptureQueriesContext(connection) as captured:
+            response = request()
+        queries = len(captured)
+        timings = []
+        for _ in range(self.rounds):
+            started = time.perf_counter()
+            request()
+            timings.append((time.perf_counter() - started) * 1000)
+        percentiles = statistics.quantiles(timings, n=100)
+        self.results[name] = {
+            'status': getattr(response, 'status_code', None),
+            'queries': queries,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentiles[94], 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'rounds': self.rounds,
+        }
+        return response
+
+
+@pytest.fixture(scope='session')
+def bench_volumes(request):
+    option = request.config.getoption
+    return Volumes(
+        users=option('--bench-users'),
+        titles=option('--bench-titles'),
+        reviews_per_title=option('--bench-reviews'),
+        comments_per_review=option('--bench-comments'),
+    )
+
+
+@pytest.fixture(scope='session')
+def bench_data(bench_volumes, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        return seed(bench_volumes)
+
+
+@pytest.fixture(autouse=True)
+def bench_settings(settings, request):
+    settings.EMAIL_QUEUE = dict(settings.EMAIL_QUEUE, ASYNC=False)
+    if not request.config.getoption('--bench-cache'):
+        settings.API_CACHE = dict(settings.API_CACHE, ENABLED=False)
+
+
+@pytest.fixture
+def bench(request):
+    recorder = getattr(request.config, '_bench_recorder', None)
+    if recorder is None:
+        rounds = request.config.getoption('--bench-rounds')
+        recorder = BenchmarkRecorder(rounds)
+        request.config._bench_recorder = recorder
+    return recorder
+
+
+def pytest_sessionfinish(session):
+    recorder = getattr(session.config, '_bench_recorder', None)
+    if recorder is None or not recorder.results:
+        return
+    option = session.config.getoption
+    commit = get_commit()
+    path = Path(option('--bench-json') or RESULTS_DIR / f'{commit}.json')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'volumes': {
+            key: option(f'--bench-{key}')
+            for key in ('users', 'titles', 'reviews', 'comments', 'rounds')
+        },
+        'cache': option('--bench-cache'),
+        'results': recorder.results,
+    }
+    with open(path, 'w') as results_file:
+        json.dump(report, results_file, indent=2, ensure_ascii=False)
+    session.config._bench_path = path
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    recorder = getattr(config, '_bench_recorder', None)
+    if recorder is None or not recorder.results:
+        return
+    previous = {}
+    compare = config.getoption('--bench-compare')
+    if compare:
+        with open(compare) as results_file:
+            previous = json.load(results_file)['results']
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line(
+        f'{"route":<32}{"queries":>8}{"p50 ms":>10}{"p95 ms":>10}'
+        f'{"p50 diff":>10}'
+    )
+    for name, result in recorder.results.items():
+        diff = ''
+        if name in previous:
+            base = previous[name]['p50_ms']
+            diff = f'{(result["p50_ms"] - base) / base * 100:+.0f}%'
+            if result['queries'] != previous[name]['queries']:
+                diff += f' q{result["queries"] - previous[name]["queries"]:+d}'
+        terminalreporter.write_line(
+            f'{name:<32}{result["queries"]:>8}{result["p50_ms"]:>10.2f}'
+            f'{result["p95_ms"]:>10.2f}{diff:>10}'
+        )
+    path = getattr(config, '_bench_path', None)
+    if path:
+        terminalreporter.write_line(f'results saved to {path}')
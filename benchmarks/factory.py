@@ -0,0 +1,109 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from reviews import search
+from reviews.models import Category, Comment, Genre, Review, Title
+
+User = get_user_model()
+
+
+class Volumes:
+    """Объём данных для замеров, задаётся опциями --bench-*."""
+
+    def __init__(self, users, titles, reviews_per_title, comments_per_review,
+                 genres=20, categories=5):
+        self.users = users
+        self.titles = titles
+        self.reviews_per_title = min(reviews_per_title, users)
+        self.comments_per_review = comments_per_review
+        self.genres = genres
+        self.categories = categories
+
+
+@contextmanager
+def explicit_pub_date():
+    """Отключает auto_now_add, чтобы bulk_create сохранил заданные даты."""
+    with mock.patch.object(
+        Review._meta.get_field('pub_date'), 'auto_now_add', False
+    ), mock.patch.object(
+        Comment._meta.get_field('pub_date'), 'auto_now_add', False
+    ):
+        yield
+
+
+def seed(volumes, batch_size=5000, seed_value=0):
+    """
+    Быстро заполняет базу через bulk_create.
+
+    Данные детерминированы seed_value, поэтому результаты разных
+    коммитов сравнимы. Хранимый рейтинг и поисковый индекс
+    пересчитываются в конце.
+    """
+    rnd = random.Random(seed_value)
+    now = timezone.now()
+
+    # id задаются явно: на SQLite bulk_create не возвращает первичные ключи.
+    users = User.objects.bulk_create(
+        (
+            User(id=idx, username=f'user{idx}', email=f'user{idx}@yamdb.fake',
+                 role=User.USER, password='')
+            for idx in range(1, volumes.users + 1)
+        ),
+        batch_size=batch_size
+    )
+    categories = Category.objects.bulk_create(
+        Category(id=idx, name=f'Категория {idx}', slug=f'category-{idx}')
+        for idx in range(1, volumes.categories + 1)
+    )
+    genres = Genre.objects.bulk_create(
+        Genre(id=idx, name=f'Жанр {idx}', slug=f'genre-{idx}')
+        for idx in range(1, volumes.genres + 1)
+    )
+    titles = Title.objects.bulk_create(
+        (
+            Title(id=idx, name=f'Произведение {idx}', year=1900 + idx % 120,
+                  category_id=categories[idx % len(categories)].pk,
+                  description=f'Описание произведения номер {idx}')
+            for idx in range(1, volumes.titles + 1)
+        ),
+        batch_size=batch_size
+    )
+    Title.genre.through.objects.bulk_create(
+        (
+            Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+            for title in titles
+            for genre in rnd.sample(genres, 2)
+        ),
+        batch_size=batch_size
+    )
+
+    reviews = [
+        Review(title_id=title.pk, author_id=author.pk, text='Текст отзыва',
+               score=rnd.randint(1, 10))
+        for title in titles
+        for author in rnd.sample(users, volumes.reviews_per_title)
+    ]
+    for idx, review in enumerate(reviews, 1):
+        review.id = idx
+        review.pub_date = now - timedelta(minutes=idx)
+    comments = [
+        Comment(review_id=review.pk, author_id=rnd.choice(users).pk,
+                text='Текст комментария', pub_date=review.pub_date)
+        for review in reviews
+        for _ in range(volumes.comments_per_review)
+    ]
+    for idx, comment in enumerate(comments, 1):
+        comment.id = idx
+        comment.pub_date += timedelta(seconds=idx % 60)
+    with explicit_pub_date():
+        Review.objects.bulk_create(reviews, batch_size=batch_size)
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+
+    Title.objects.all().rebuild_rating()
+    search.rebuild()
+    return users, titles, reviews
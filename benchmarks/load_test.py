@@ -0,0 +1,212 @@
+"""
+Нагрузочный тест чтения: gunicorn (WSGI, синхронные представления)
+против uvicorn (ASGI, api/async_views.py) на одной заполненной базе SQLite.
+
+Каждый из --connections клиентов держит keep-alive соединение и в течение
+--duration секунд запрашивает списки и объекты произведений, отзывов
+и комментариев. С --conditional клиенты повторяют запросы с полученным
+ETag, как опрашивающие ленту приложения.
+
+    python benchmarks/load_test.py --connections 64 --workers 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / 'api_yamdb')]
+
+from benchmarks.sqlite_concurrency import (  # noqa: E402
+    create_template, setup_django,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--reviews', type=int, default=5,
+                        help='Reviews per title in the seed data.')
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8,
+                        help='Threads per gunicorn gthread worker.')
+    parser.add_argument('--servers', default='wsgi,asgi')
+    parser.add_argument('--conditional', action='store_true',
+                        help='Revalidate with If-None-Match.')
+    parser.add_argument('--json', help='Write results to this file.')
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(name, port, args):
+    if name == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', 'api_yamdb.wsgi:application',
+                '--workers', str(args.workers), '--worker-class', 'gthread',
+                '--threads', str(args.threads),
+                '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    return [sys.executable, '-m', 'uvicorn', 'api_yamdb.asgi:application',
+            '--workers', str(args.workers), '--port', str(port),
+            '--log-level', 'warning', '--no-access-log']
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not start')
+
+
+class Connection:
+    """Минимальный HTTP/1.1 клиент с keep-alive поверх asyncio."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, path, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                '127.0.0.1', self.port
+            )
+        lines = [f'GET {path} HTTP/1.1', 'Host: localhost']
+        lines += [f'{name}: {value}'
+                  for name, value in (headers or {}).items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        for line in header_lines:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                response_headers[name.strip().lower()] = value.strip()
+        length = int(response_headers.get('content-length', 0))
+        if length:
+            await self.reader.readexactly(length)
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, response_headers
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def make_paths(args, rnd):
+    title = rnd.randint(1, args.titles)
+    review = (title - 1) * args.reviews + rnd.randint(1, args.reviews)
+    return rnd.choice((
+        '/api/v1/titles/',
+        f'/api/v1/titles/?offset={rnd.randrange(0, args.titles, 10)}',
+        f'/api/v1/titles/{title}/',
+        f'/api/v1/titles/{title}/reviews/',
+        f'/api/v1/titles/{title}/reviews/{review}/comments/',
+    ))
+
+
+async def client(port, args, deadline, results, seed_value):
+    rnd = random.Random(seed_value)
+    connection = Connection(port)
+    etags = {}
+    while time.monotonic() < deadline:
+        path = make_paths(args, rnd)
+        headers = {}
+        if args.conditional and path in etags:
+            headers['If-None-Match'] = etags[path]
+        started = time.perf_counter()
+        try:
+            status, response_headers = await connection.request(path,
+                                                                headers)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            results['errors'] += 1
+            await connection.close()
+            continue
+        results['latencies'].append(time.perf_counter() - started)
+        results['statuses'][status] = results['statuses'].get(status, 0) + 1
+        if 'etag' in response_headers:
+            etags[path] = response_headers['etag']
+    await connection.close()
+
+
+async def run_load(port, args):
+    results = {'latencies': [], 'statuses': {}, 'errors': 0}
+    deadline = time.monotonic() + args.duration
+    await asyncio.gather(*(
+        client(port, args, deadline, results, idx)
+        for idx in range(args.connections)
+    ))
+    latencies = results['latencies']
+    return {
+        'requests': len(latencies),
+        'per_second': round(len(latencies) / args.duration, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(
+            statistics.quantiles(latencies, n=100)[94] * 1000, 2
+        ),
+        'statuses': results['statuses'],
+        'errors': results['errors'],
+    }
+
+
+def run_server(name, db_path, args):
+    port = free_port()
+    env = dict(os.environ, DB_ENGINE='sqlite', DB_NAME=str(db_path),
+               API_ASYNC_VIEWS='1' if name == 'asgi' else '0',
+               DJANGO_SETTINGS_MODULE='api_yamdb.settings')
+    process = subprocess.Popen(server_command(name, port, args),
+                               cwd=ROOT / 'api_yamdb', env=env)
+    try:
+        wait_for_port(port)
+        return asyncio.run(run_load(port, args))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    args = parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix='yamdb-load-'))
+    db_path = workdir / 'load.sqlite3'
+    try:
+        setup_django(db_path)
+        create_template(db_path, args)
+        report = {}
+        for name in args.servers.split(','):
+            report[name] = run_server(name, db_path, args)
+            print(f'{name:<5} req/s={report[name]["per_second"]:<8} '
+                  f'p50={report[name]["p50_ms"]}ms '
+                  f'p95={report[name]["p95_ms"]}ms '
+                  f'statuses={report[name]["statuses"]} '
+                  f'errors={report[name]["errors"]}')
+        if args.json:
+            with open(args.json, 'w') as results_file:
+                json.dump({'args': vars(args), 'results': report},
+                          results_file, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
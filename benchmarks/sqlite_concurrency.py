@@ -0,0 +1,216 @@
+"""
+Пропускная способность чтения /api/v1/titles/ при параллельной записи
+отзывов на файловой базе SQLite.
+
+Для каждого профиля pragma база заполняется заново, затем --readers
+потоков читают список произведений, а --writers потоков публикуют
+отзывы в течение --duration секунд. Профиль rollback — настройки SQLite
+по умолчанию, tuned — SQLITE_PRAGMAS из settings.
+
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 2
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / 'api_yamdb')]
+
+ROLLBACK_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'busy_timeout': 5000,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--reviews', type=int, default=5,
+                        help='Reviews per title in the seed data.')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--profiles', default='rollback,tuned')
+    parser.add_argument('--json', help='Write results to this file.')
+    return parser.parse_args()
+
+
+def setup_django(db_path):
+    os.environ['DB_ENGINE'] = 'sqlite'
+    os.environ['DB_NAME'] = str(db_path)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.API_CACHE = dict(settings.API_CACHE, ENABLED=False)
+    settings.METRICS = dict(settings.METRICS, ENABLED=False)
+    settings.ALLOWED_HOSTS = ['*']
+
+
+def create_template(db_path, args):
+    from django.core.management import call_command
+    from django.db import connections
+
+    from benchmarks.factory import Volumes, seed
+
+    call_command('migrate', verbosity=0)
+    seed(Volumes(users=args.users, titles=args.titles,
+                 reviews_per_title=args.reviews, comments_per_review=0))
+    connections.close_all()
+
+
+def use_database(path, pragmas):
+    from django.conf import settings
+    from django.db import connections
+
+    connections.close_all()
+    settings.SQLITE_PRAGMAS = pragmas
+    connections['default'].settings_dict['NAME'] = str(path)
+
+
+def make_client(user):
+    from rest_framework.test import APIClient
+
+    from api.authentication import ClaimsAccessToken
+
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(user)}'
+    )
+    return client
+
+
+def summarize(timings, duration):
+    if len(timings) < 2:
+        return {'count': len(timings)}
+    return {
+        'count': len(timings),
+        'per_second': round(len(timings) / duration, 1),
+        'p50_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(statistics.quantiles(timings, n=100)[94] * 1000, 2),
+    }
+
+
+class Workload:
+    """Потоки читателей и писателей, работающие до общего дедлайна."""
+
+    def __init__(self, args):
+        self.args = args
+        self.deadline = time.monotonic() + args.duration
+        self.lock = threading.Lock()
+        self.reads = []
+        self.writes = []
+        self.errors = 0
+
+    def timed(self, timings, expected_status, request):
+        started = time.perf_counter()
+        try:
+            status = request().status_code
+        except Exception:
+            status = None
+        with self.lock:
+            if status == expected_status:
+                timings.append(time.perf_counter() - started)
+            else:
+                self.errors += 1
+
+    def reader(self):
+        from django.db import connection
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        while time.monotonic() < self.deadline:
+            self.timed(self.reads, 200,
+                       lambda: client.get('/api/v1/titles/'))
+        connection.close()
+
+    def writer(self, user, first_title):
+        from django.db import connection
+
+        client = make_client(user)
+        title_id = first_title
+        while time.monotonic() < self.deadline:
+            url = f'/api/v1/titles/{title_id}/reviews/'
+            self.timed(self.writes, 201, lambda: client.post(
+                url, data={'text': 'Отзыв', 'score': 7}
+            ))
+            title_id = title_id % self.args.titles + 1
+        connection.close()
+
+    def run(self, writers):
+        step = self.args.titles // max(len(writers), 1)
+        threads = [threading.Thread(target=self.reader)
+                   for _ in range(self.args.readers)]
+        threads += [threading.Thread(target=self.writer,
+                                     args=(user, idx * step + 1))
+                    for idx, user in enumerate(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            'reads': summarize(self.reads, self.args.duration),
+            'writes': summarize(self.writes, self.args.duration),
+            'errors': self.errors,
+        }
+
+
+def run_profile(args):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    User = get_user_model()
+    writers = [
+        User.objects.create(username=f'writer{idx}',
+                            email=f'writer{idx}@yamdb.fake')
+        for idx in range(args.writers)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+    connection.close()
+    return {'journal_mode': journal_mode, **Workload(args).run(writers)}
+
+
+def main():
+    args = parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix='yamdb-sqlite-'))
+    template = workdir / 'template.sqlite3'
+    try:
+        setup_django(template)
+        from django.conf import settings
+        profiles = {'rollback': ROLLBACK_PRAGMAS,
+                    'tuned': settings.SQLITE_PRAGMAS}
+        use_database(template, ROLLBACK_PRAGMAS)
+        create_template(template, args)
+
+        report = {}
+        for name in args.profiles.split(','):
+            path = workdir / f'{name}.sqlite3'
+            shutil.copy(template, path)
+            use_database(path, profiles[name])
+            report[name] = run_profile(args)
+            print(f'{name:<10} journal={report[name]["journal_mode"]:<7} '
+                  f'reads/s={report[name]["reads"].get("per_second", 0):<8} '
+                  f'read p95={report[name]["reads"].get("p95_ms", "-")}ms '
+                  f'writes/s={report[name]["writes"].get("per_second", 0):<7}'
+                  f' errors={report[name]["errors"]}')
+        if args.json:
+            with open(args.json, 'w') as results_file:
+                json.dump({'args': vars(args), 'results': report},
+                          results_file, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Замеры латентности и числа SQL-запросов для эндпоинтов API.
+
+Запуск (база SQLite в памяти, сеть не нужна):
+
+    pytest benchmarks/ --bench-titles 2000 --bench-compare old.json
+"""
+from itertools import count
+
+import pytest
+from django.core import mail
+from rest_framework.test import APIClient
+
+from api.authentication import ClaimsAccessToken
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def admin_client(django_user_model):
+    admin = django_user_model.objects.create_user(
+        username='bench-admin', email='bench-admin@yamdb.fake',
+        role='admin'
+    )
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(admin)}'
+    )
+    return client
+
+
+@pytest.fixture
+def user_client(bench_data):
+    users, _, _ = bench_data
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(users[0])}'
+    )
+    return client
+
+
+def get(client, url):
+    return lambda: client.get(url)
+
+
+class TestTitlesBenchmark:
+
+    @pytest.mark.parametrize('name, query', [
+        ('titles', ''),
+        ('titles?genre', '?genre=genre-1,genre-2'),
+        ('titles?genre_match=all', '?genre=genre-1,genre-2&genre_match=all'),
+        ('titles?category&year', '?category=category-1&year=1950'),
+        ('titles?search', '?search=номер'),
+        ('titles?offset', '?limit=10&offset=500'),
+    ])
+    def test_titles_list(self, bench, bench_data, client, name, query):
+        response = bench(name, get(client, f'/api/v1/titles/{query}'))
+        assert response.status_code == 200
+
+    def test_title_detail(self, bench, bench_data, client):
+        _, titles, _ = bench_data
+        response = bench('titles/{id}',
+                         get(client, f'/api/v1/titles/{titles[0].pk}/'))
+        assert response.status_code == 200
+
+    @pytest.mark.parametrize('name', ['genres', 'categories'])
+    def test_dictionaries(self, bench, bench_data, client, name):
+        response = bench(name, get(client, f'/api/v1/{name}/'))
+        assert response.status_code == 200
+
+
+class TestReviewsBenchmark:
+
+    @pytest.mark.parametrize('name, query', [
+        ('reviews', ''),
+        ('reviews?offset', '?limit=5&offset=5'),
+        ('reviews?cursor', '?cursor='),
+    ])
+    def test_reviews_list(self, bench, bench_data, client, name, query):
+        _, titles, _ = bench_data
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/{query}'
+        response = bench(name, get(client, url))
+        assert response.status_code == 200
+
+    def test_comments_list(self, bench, bench_data, client):
+        _, _, reviews = bench_data
+        review = reviews[0]
+        url = (f'/api/v1/titles/{review.title_id}/reviews/{review.pk}'
+               '/comments/')
+        response = bench('comments', get(client, url))
+        assert response.status_code == 200
+
+    def test_comment_create(self, bench, bench_data, user_client):
+        _, _, reviews = bench_data
+        review = reviews[0]
+        url = (f'/api/v1/titles/{review.title_id}/reviews/{review.pk}'
+               '/comments/')
+        response = bench('comments POST', lambda: user_client.post(
+            url, data={'text': 'Комментарий'}
+        ))
+        assert response.status_code == 201
+
+
+class TestAuthBenchmark:
+
+    def test_signup(self, bench, bench_data, client):
+        numbers = count()
+
+        def signup():
+            idx = next(numbers)
+            return client.post('/api/v1/auth/signup/', data={
+                'username': f'signup{idx}',
+                'email': f'signup{idx}@yamdb.fake'
+            })
+
+        response = bench('auth/signup', signup)
+        assert response.status_code == 200
+
+    def test_token(self, bench, bench_data, client):
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'bench-token', 'email': 'bench-token@yamdb.fake'
+        })
+        assert response.status_code == 200
+        # Код подтверждения из письма, как его получит пользователь.
+        data = {
+            'username': 'bench-token',
+            'confirmation_code': mail.outbox[-1].body.split(': ')[-1]
+        }
+        response = bench('auth/token', lambda: client.post(
+            '/api/v1/auth/token/', data=data
+        ))
+        assert response.status_code == 201
+        assert 'token' in response.json()
+
+
+class TestUsersBenchmark:
+
+    def test_users_search(self, bench, bench_data, admin_client):
+        response = bench('users?search',
+                         get(admin_client, '/api/v1/users/?search=user1'))
+        assert response.status_code == 200
+
+    def test_users_me(self, bench, bench_data, user_client):
+        response = bench('users/me', get(user_client, '/api/v1/users/me/'))
+        assert response.status_code == 200
@@ -0,0 +1,39 @@
+"""
+Микробенчмарк сериализации страницы списка произведений:
+ReadOnlyTitleSerializer по объектам моделей с prefetch жанров
+против CompiledTitleSerializer по строкам .values().
+
+    pytest benchmarks/test_serializers.py --bench-titles 2000
+"""
+import pytest
+
+from api.serializers import CompiledTitleSerializer, ReadOnlyTitleSerializer
+from reviews.models import Title
+
+pytestmark = pytest.mark.django_db
+
+PAGE_SIZE = 100
+
+
+def serialize_models():
+    titles = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre').order_by('pk')[:PAGE_SIZE]
+    return ReadOnlyTitleSerializer(titles, many=True).data
+
+
+def serialize_values():
+    rows = CompiledTitleSerializer().values_queryset(
+        Title.objects.order_by('pk')
+    )[:PAGE_SIZE]
+    return CompiledTitleSerializer(rows, many=True).data
+
+
+class TestTitleSerializersBenchmark:
+
+    def test_compiled_title_serializer(self, bench, bench_data):
+        expected = bench('serializer ReadOnlyTitle', serialize_models)
+        data = bench('serializer CompiledTitle', serialize_values)
+        assert data == expected
+        assert (bench.results['serializer CompiledTitle']['p50_ms']
+                < bench.results['serializer ReadOnlyTitle']['p50_ms'])
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from http import HTTPStatus
 
 import pytest
@@ -375,3 +376,118 @@ class Test00UserRegistration:
             'пользователя, созданного администратором,  возвращает ответ '
             'со статусом 200.'
         )
+
+    def test_signup_email_is_sent_in_background(self, client, settings):
+        from api.mail import mail_queue
+        from users.models import OutgoingEmail
+
+        settings.EMAIL_QUEUE = dict(settings.EMAIL_QUEUE, ASYNC=True,
+                                    BATCH_WAIT=0)
+        outbox_before_count = len(mail.outbox)
+        valid_data = {
+            'email': 'queued@yamdb.fake',
+            'username': 'queued_username'
+        }
+        response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        mail_queue.join()
+
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            f'Проверьте, что после POST-запроса к `{self.URL_SIGNUP}` письмо '
+            'с кодом подтверждения отправляется фоновой очередью.'
+        )
+        email = OutgoingEmail.objects.get(to=valid_data['email'])
+        assert (email.status, email.attempts) == (OutgoingEmail.SENT, 1), (
+            'Проверьте, что статус доставки письма сохраняется в OUTBOX.'
+        )
+
+    def test_failed_email_is_retried_from_outbox(self, client, monkeypatch):
+        from django.core.management import call_command
+        from users.models import OutgoingEmail
+
+        def broken_send(self, fail_silently=False):
+            raise ConnectionError('SMTP is down')
+
+        valid_data = {
+            'email': 'retry@yamdb.fake',
+            'username': 'retry_username'
+        }
+        with monkeypatch.context() as patch:
+            patch.setattr(mail.EmailMessage, 'send', broken_send)
+            response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        email = OutgoingEmail.objects.get(to=valid_data['email'])
+        assert (email.status, email.attempts) == (OutgoingEmail.PENDING, 1), (
+            'Проверьте, что неотправленное письмо остаётся в OUTBOX со '
+            'статусом `pending`.'
+        )
+
+        call_command('send_queued_mail')
+        email.refresh_from_db()
+        assert (email.status, email.attempts) == (OutgoingEmail.SENT, 2), (
+            'Проверьте, что команда `send_queued_mail` повторно отправляет '
+            'письма из OUTBOX.'
+        )
+        assert valid_data['email'] in mail.outbox[-1].to
+
+    def test_pending_email_is_sent_once(self):
+        from django.core.management import call_command
+        from api.mail import MailQueue
+        from users.models import OutgoingEmail
+
+        email = OutgoingEmail.objects.create(
+            subject='Подтверждение аккаунта', body='Код подтверждения: 1',
+            from_email='django@example.com', to='once@yamdb.fake'
+        )
+        outbox_before_count = len(mail.outbox)
+        # Два процесса после перезапуска восстанавливают одну очередь.
+        queues = [MailQueue(), MailQueue()]
+        for mail_queue in queues:
+            mail_queue._recover()
+        for mail_queue in queues:
+            mail_queue.deliver([mail_queue._queue.get_nowait()])
+        call_command('send_queued_mail')
+
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что письмо из OUTBOX отправляется один раз, даже '
+            'если его восстановили несколько процессов.'
+        )
+        email.refresh_from_db()
+        assert (email.status, email.attempts) == (OutgoingEmail.SENT, 1)
+
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            status=OutgoingEmail.SENDING,
+            claimed_at=email.created - timedelta(hours=1)
+        )
+        call_command('send_queued_mail')
+        assert len(mail.outbox) == outbox_before_count + 2, (
+            'Проверьте, что письмо, зависшее в статусе `sending`, '
+            'после SENDING_TIMEOUT отправляется повторно.'
+        )
+
+    def test_signup_token_and_authenticated_request(self, client):
+        from rest_framework.test import APIClient
+
+        valid_data = {
+            'email': 'token@yamdb.fake',
+            'username': 'token_username'
+        }
+        response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        code = mail.outbox[-1].body.split(': ')[-1]
+        response = client.post(self.URL_TOKEN, data={
+            'username': valid_data['username'], 'confirmation_code': code
+        })
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос к `{self.URL_TOKEN}` с кодом '
+            'подтверждения существующего пользователя выдаёт токен.'
+        )
+        api_client = APIClient()
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}'
+        )
+        response = api_client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что выданный токен аутентифицирует пользователя.'
+        )
+        assert response.json()['username'] == valid_data['username']
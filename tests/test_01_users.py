@@ -564,3 +564,98 @@ class Test01UserAPI:
             f'Проверьте, что PATCH-запрос к `{self.USERS_ME_URL}` с ключом '
             '`role` не изменяет роль пользователя.'
         )
+
+    def test_11_claims_token_reads_only_token_version(self, admin_client,
+                                                      user,
+                                                      django_user_model):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.test import APIClient
+
+        from api.authentication import ClaimsAccessToken
+
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {ClaimsAccessToken.for_user(user)}'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        user_queries = [query['sql'] for query in queries
+                        if 'users_user' in query['sql']]
+        # Без JWT_AUTH_CACHE остаётся один SELECT token_version.
+        assert len(user_queries) == 1 and '"role"' not in user_queries[0], (
+            'Проверьте, что запрос с токеном, содержащим claims роли, '
+            'читает из базы данных только token_version пользователя.'
+        )
+        response = client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'admin'}
+        )
+        response = client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что смена роли пользователя администратором '
+            'сразу применяется к уже выданным токенам.'
+        )
+        admin_token = ClaimsAccessToken.for_user(
+            django_user_model.objects.get(pk=user.pk)
+        )
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {admin_token}')
+        assert client.get(self.USERS_URL).status_code == HTTPStatus.OK
+
+        admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'user'}
+        )
+        cache.clear()
+        response = client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что после понижения роли токен с прежней ролью '
+            'в claims не возвращает права, даже если кэш очищен.'
+        )
+
+        admin_client.delete(f'{self.USERS_URL}{user.username}/')
+        response = client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токен удалённого пользователя перестаёт '
+            'действовать.'
+        )
+
+    def test_12_token_version_shared_cache(self, admin_client, user,
+                                           django_user_model, settings):
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.test import APIClient
+
+        from api.authentication import ClaimsAccessToken
+
+        settings.JWT_AUTH_CACHE = {'ALIAS': 'default', 'TIMEOUT': 60}
+        admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'admin'}
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer {}'.format(
+            ClaimsAccessToken.for_user(django_user_model.objects.get(
+                pk=user.pk
+            ))
+        ))
+        assert client.get(self.USERS_URL).status_code == HTTPStatus.OK
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/api/v1/titles/')
+        assert not any('users_user' in query['sql'] for query in queries), (
+            'Проверьте, что token_version читается из JWT_AUTH_CACHE, '
+            'если кэш настроен.'
+        )
+        admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'user'}
+        )
+        assert client.get(self.USERS_URL).status_code == HTTPStatus.FORBIDDEN
+        cache.clear()
+        response = client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что вытеснение token_version из кэша не возвращает '
+            'старому токену прежнюю роль.'
+        )
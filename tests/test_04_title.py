@@ -1,10 +1,13 @@
 from http import HTTPStatus
 
 import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (
     check_pagination, check_permissions, create_categories, create_genre,
-    create_titles
+    create_single_review, create_titles
 )
 
 
@@ -353,3 +356,184 @@ class Test04TitleAPI:
             f'Проверьте, что PUT-запрос к `{self.TITLES_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_titles_list_query_count(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        with CaptureQueriesContext(connection) as small_page:
+            response = client.get(self.TITLES_URL)
+        assert len(response.json()['results']) == len(titles)
+
+        for idx in range(6):
+            admin_client.post(self.TITLES_URL, data={
+                'name': f'Произведение {idx}',
+                'year': 2000 + idx,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[idx % 2]['slug'],
+                'description': 'Описание'
+            })
+        with CaptureQueriesContext(connection) as large_page:
+            response = client.get(self.TITLES_URL)
+        assert len(response.json()['results']) == len(titles) + 6
+        assert len(large_page) == len(small_page), (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` выполняет '
+            'одинаковое число SQL-запросов независимо от размера страницы: '
+            'категории и жанры произведений должны загружаться через '
+            '`select_related` и `prefetch_related`.'
+        )
+
+    def test_08_titles_list_cache_invalidation(self, client, admin_client,
+                                               user_client):
+        titles, _, genres = create_titles(admin_client)
+        response = client.get(self.TITLES_URL)
+        assert response['X-Cache'] == 'MISS'
+        response = client.get(self.TITLES_URL)
+        assert response['X-Cache'] == 'HIT', (
+            f'Проверьте, что повторный GET-запрос к `{self.TITLES_URL}` '
+            'обслуживается из кэша.'
+        )
+
+        create_single_review(user_client, titles[0]['id'], 'Отлично', 10)
+        response = client.get(self.TITLES_URL)
+        assert response['X-Cache'] == 'MISS'
+        rating = {
+            title['id']: title['rating'] for title in response.json()['results']
+        }
+        assert rating[titles[0]['id']] == 10, (
+            'Проверьте, что новый отзыв сбрасывает кэш списка произведений '
+            f'`{self.TITLES_URL}`.'
+        )
+
+        admin_client.delete(f'/api/v1/genres/{genres[2]["slug"]}/')
+        response = client.get(self.TITLES_URL)
+        title = next(
+            title for title in response.json()['results']
+            if title['id'] == titles[1]['id']
+        )
+        assert title['genre'] == [], (
+            'Проверьте, что удаление жанра сбрасывает кэш списка '
+            f'произведений `{self.TITLES_URL}`.'
+        )
+
+    def test_09_titles_full_text_search(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+
+        response = client.get(self.TITLES_URL, {'search': 'терм'})
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [titles[0]['id']], (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` с параметром '
+            '`search` находит произведения по началу слова в названии.'
+        )
+        response = client.get(self.TITLES_URL, {'search': 'yippie'})
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [titles[1]['id']], (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` с параметром '
+            '`search` ищет и по описанию произведения.'
+        )
+
+        admin_client.patch(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[1]['id']),
+            data={'name': 'Терминатор 2'}
+        )
+        response = client.get(self.TITLES_URL, {'search': 'Терминатор'})
+        results = response.json()['results']
+        assert len(results) == 2, (
+            'Проверьте, что поисковый индекс обновляется при изменении '
+            'произведения.'
+        )
+
+        admin_client.delete(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        )
+        response = client.get(self.TITLES_URL, {'search': 'Терминатор'})
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [titles[1]['id']], (
+            'Проверьте, что удалённое произведение пропадает из поиска.'
+        )
+
+    def test_10_titles_filter_by_slug_lists(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+
+        def result_ids(params):
+            response = client.get(self.TITLES_URL, params)
+            assert response.status_code == HTTPStatus.OK
+            return sorted(title['id'] for title in response.json()['results'])
+
+        first, second = titles[0]['id'], titles[1]['id']
+        assert result_ids({'genre': 'horr'}) == [], (
+            'Проверьте, что фильтр `genre` сравнивает slug жанра точно.'
+        )
+        assert result_ids({'genre_contains': 'horr'}) == [first], (
+            'Проверьте, что фильтр `genre_contains` ищет по подстроке slug.'
+        )
+        assert result_ids({'genre': 'horror,drama'}) == [first, second], (
+            'Проверьте, что фильтр `genre` со списком slug возвращает '
+            'произведения с любым из перечисленных жанров.'
+        )
+        assert result_ids(
+            {'genre': 'horror,comedy', 'genre_match': 'all'}
+        ) == [first], (
+            'Проверьте, что фильтр `genre` с `genre_match=all` возвращает '
+            'только произведения со всеми перечисленными жанрами.'
+        )
+        assert result_ids(
+            {'genre': 'horror,drama', 'genre_match': 'all'}
+        ) == []
+        assert result_ids(
+            {'genre': 'horror,unknown', 'genre_match': 'all'}
+        ) == []
+        assert result_ids(
+            {'category': f'{categories[0]["slug"]},{categories[1]["slug"]}'}
+        ) == [first, second], (
+            'Проверьте, что фильтр `category` принимает список slug.'
+        )
+        assert result_ids({'category_contains': 'film'}) == [first]
+
+    def test_11_titles_search_rechecked_after_migrate(self, client,
+                                                      admin_client):
+        from reviews import search
+
+        titles, _, _ = create_titles(admin_client)
+        search._available[connection.alias] = False
+        call_command('migrate', verbosity=0)
+        assert search.is_available(connection), (
+            'Проверьте, что наличие поискового индекса проверяется '
+            'заново после `migrate`.'
+        )
+        response = client.get(self.TITLES_URL, {'search': 'yippie'})
+        results = response.json()['results']
+        assert [title['id'] for title in results] == [titles[1]['id']]
+
+    def test_12_titles_rating_columns_read_only(self, admin_client):
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        data = {'name': 'С рейтингом', 'year': 2000, 'category': 'films',
+                'description': 'Описание', 'rating_sum': 99,
+                'rating_count': 10, 'score_10': 5, 'rating_bayes': 9.9}
+        response = admin_client.post(self.TITLES_URL, data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['rating'] is None and not (
+            {'rating_sum', 'score_10', 'rating_bayes'} & set(response.json())
+        ), (
+            f'Проверьте, что ответ на POST-запрос к `{self.TITLES_URL}` '
+            'не содержит служебных колонок рейтинга.'
+        )
+        url = self.TITLES_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        response = admin_client.patch(url, data={'rating_sum': 99,
+                                                 'score_1': 3})
+        assert response.status_code == HTTPStatus.OK
+        response = admin_client.post(f'{self.TITLES_URL}bulk/', data=[
+            dict(data, name='Из bulk', genre=[])
+        ], format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        for title in Title.objects.filter(
+            name__in=['С рейтингом', titles[0]['name'], 'Из bulk']
+        ):
+            assert (title.rating_sum, title.rating_count,
+                    title.score_histogram[10], title.score_histogram[1],
+                    title.rating_bayes) == (0, 0, 0, 0, None), (
+                'Проверьте, что колонки рейтинга нельзя записать '
+                'через API произведений.'
+            )
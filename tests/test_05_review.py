@@ -1,11 +1,15 @@
+from datetime import timedelta
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from tests.utils import (
     check_fields, check_pagination, create_reviews, create_single_review,
-    create_titles
+    create_titles, data_queries
 )
 
 
@@ -413,3 +417,250 @@ class Test05ReviewAPI:
             f'Проверьте, что PUT-запрос к `{self.REVIEW_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_reviews_rating_is_maintained(
+            self, admin_client, admin, user_client, user, moderator_client,
+            moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_url = self.TITLE_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+
+        admin_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            ),
+            data={'score': 8}
+        )
+        assert admin_client.get(title_url).json().get('rating') == 6, (
+            'Проверьте, что изменение оценки в отзыве через PATCH-запрос к '
+            f'`{self.REVIEW_DETAIL_URL_TEMPLATE}` пересчитывает рейтинг '
+            'произведения.'
+        )
+
+        admin_client.delete(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            )
+        )
+        assert admin_client.get(title_url).json().get('rating') == 5, (
+            'Проверьте, что удаление отзыва через DELETE-запрос к '
+            f'`{self.REVIEW_DETAIL_URL_TEMPLATE}` пересчитывает рейтинг '
+            'произведения.'
+        )
+
+        from django.core.management import call_command
+        from reviews.models import Title
+        Title.objects.update(rating_sum=0, rating_count=0)
+        call_command('rebuild_ratings')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (10, 2), (
+            'Проверьте, что команда `rebuild_ratings` восстанавливает '
+            'хранимый рейтинг произведения по отзывам.'
+        )
+        response = admin_client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[1]['id'])
+        )
+        assert response.json().get('rating') is None, (
+            'Проверьте, что у произведения без отзывов рейтинг равен `None`.'
+        )
+
+    def test_08_reviews_cursor_pagination(
+            self, client, admin_client, admin, user_client, user,
+            moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+
+        response = client.get(url, {'cursor': '', 'limit': 2})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data and data.get('next'), (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` '
+            'с параметром `cursor` возвращает курсорную пагинацию без '
+            'ключа `count` и со ссылкой `next`.'
+        )
+        assert len(data['results']) == 2
+
+        response = client.get(data['next'])
+        data = response.json()
+        assert data.get('next') is None and data.get('previous'), (
+            f'Проверьте, что ссылка `next` для `{self.REVIEWS_URL_TEMPLATE}` '
+            'ведёт на последнюю страницу ленты.'
+        )
+        assert [review['id'] for review in data['results']] == [
+            reviews[0]['id']
+        ], (
+            'Проверьте, что курсорная пагинация отдаёт отзывы от новых '
+            'к старым без повторов и пропусков.'
+        )
+
+    def test_09_reviews_conditional_get(
+            self, client, admin_client, admin, user_client, user,
+            moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+
+        response = client.get(url)
+        etag = response.get('ETag')
+        assert etag, (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` '
+            'возвращает заголовок `ETag`.'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` '
+            'с актуальным `If-None-Match` возвращает статус 304.'
+        )
+        assert not data_queries(
+            [query['sql'] for query in queries.captured_queries]
+        ), (
+            'Проверьте, что ответ 304 отдаётся без запросов к данным: '
+            'читаются только версии кэша.'
+        )
+
+        moderator_client.post(url, data={'text': 'Новый отзыв', 'score': 5})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что после нового отзыва GET-запрос к '
+            f'`{self.REVIEWS_URL_TEMPLATE}` со старым `If-None-Match` '
+            'возвращает свежую ленту.'
+        )
+        assert response.get('ETag') != etag
+        assert response.json()['count'] == len(author_map) + 1
+
+        other_url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[1]['id'])
+        other_etag = client.get(other_url).get('ETag')
+        response = client.get(other_url, HTTP_IF_NONE_MATCH=other_etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что отзыв к одному произведению не сбрасывает '
+            'ETag ленты отзывов другого произведения.'
+        )
+
+    def test_10_reviews_rating_after_author_deleted(
+            self, admin_client, admin, user_client, user, moderator_client,
+            moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        user_client.patch(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title_id, review_id=reviews[1]['id']
+            ),
+            data={'score': 8}
+        )
+        title_url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        assert admin_client.get(title_url).json()['rating'] == 6
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+        assert admin_client.get(title_url).json()['rating'] == 5, (
+            'Проверьте, что удаление пользователя вместе с его отзывами '
+            'пересчитывает рейтинг произведения.'
+        )
+        ratings = admin_client.get(f'{title_url}ratings/').json()
+        assert (ratings['count'], ratings['histogram']['8'],
+                ratings['histogram']['5']) == (2, 0, 2), (
+            'Проверьте, что удаление пользователя убирает оценки его '
+            'отзывов из распределения оценок произведения.'
+        )
+        top = admin_client.get('/api/v1/titles/top/',
+                               {'score': 'average'}).json()
+        assert [(title['id'], title['score']) for title in top] == [
+            (title_id, 5)
+        ]
+        trending = admin_client.get('/api/v1/titles/trending/').json()
+        assert [(title['id'], title['score']) for title in trending] == [
+            (title_id, 2)
+        ], (
+            'Проверьте, что удаление пользователя уменьшает счётчик '
+            'отзывов произведения за день.'
+        )
+
+    def test_11_reviews_last_modified(self, client, admin_client, admin,
+                                      moderator_client, monkeypatch):
+        from types import SimpleNamespace
+
+        from api import cache as cache_module
+        from reviews.models import CacheVersion
+
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        namespaces = (f'reviews:{titles[0]["id"]}', 'users')
+        client.get(url)
+        _, modified_at = cache_module.response_cache.get_state(namespaces)
+
+        with monkeypatch.context() as patch:
+            patch.setattr(cache_module, 'time',
+                          SimpleNamespace(time=lambda: modified_at))
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert not response.has_header('Last-Modified'), (
+            'Проверьте, что `Last-Modified` не отдаётся, пока не прошла '
+            'секунда последнего изменения: запись в ту же секунду '
+            'не изменила бы его.'
+        )
+
+        CacheVersion.objects.filter(name__in=namespaces).update(
+            modified=timezone.now() - timedelta(seconds=5)
+        )
+        response = client.get(url)
+        last_modified = response.get('Last-Modified')
+        assert last_modified, (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` '
+            'возвращает заголовок `Last-Modified`.'
+        )
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        moderator_client.post(url, data={'text': 'Новый отзыв', 'score': 5})
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после нового отзыва GET-запрос со старым '
+            '`If-Modified-Since` возвращает свежую ленту.'
+        )
+        assert response.json()['count'] == 2
+
+    def test_12_reviews_other_integrity_errors_not_masked(
+            self, admin_client, user_client, monkeypatch):
+        from reviews.models import Review, TitleReviewDayQuerySet
+
+        titles, _, _ = create_titles(admin_client)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+
+        def broken_record(*args, **kwargs):
+            raise IntegrityError('NOT NULL constraint failed')
+
+        with monkeypatch.context() as patch:
+            patch.setattr(TitleReviewDayQuerySet, 'record', broken_record)
+            with pytest.raises(IntegrityError):
+                user_client.post(url, data={'text': 'Отзыв', 'score': 5})
+        assert not Review.objects.exists(), (
+            'Проверьте, что отзыв не сохраняется, если запись '
+            'не удалась.'
+        )
+
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 5)
+        response = user_client.post(url, data={'text': 'Ещё', 'score': 6})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что повторный отзыв на `{url}` возвращает '
+            'статус 400.'
+        )
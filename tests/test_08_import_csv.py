@@ -0,0 +1,192 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08ImportCsv:
+
+    def test_01_import_csv_loads_all_files(self):
+        from reviews.models import Comment, Review, Title
+        from users.models import User
+
+        out = StringIO()
+        call_command('import_csv', batch_size=10, stdout=out)
+        counts = (
+            Title.objects.count(), Title.genre.through.objects.count(),
+            Review.objects.count(), Comment.objects.count(),
+            User.objects.count()
+        )
+        assert all(counts), (
+            'Проверьте, что команда `import_csv` загружает все csv-файлы '
+            'из `static/data/`.'
+        )
+        assert 'rows/s' in out.getvalue(), (
+            'Проверьте, что команда `import_csv` сообщает скорость загрузки.'
+        )
+
+        review = Review.objects.order_by('id').first()
+        assert review.pub_date.year == 2019, (
+            'Проверьте, что команда `import_csv` сохраняет дату `pub_date` '
+            'из csv-файла.'
+        )
+        assert Title.objects.get(pk=review.title_id).rating_count, (
+            'Проверьте, что после импорта пересчитывается рейтинг '
+            'произведений.'
+        )
+
+        call_command('import_csv', stdout=StringIO())
+        assert Review.objects.count() == counts[2], (
+            'Проверьте, что повторный запуск `import_csv` не дублирует данные.'
+        )
+
+    def test_02_import_csv_resumes_from_checkpoint(self, tmp_path):
+        import csv
+        import json
+
+        from django.conf import settings
+        from reviews.models import Review
+
+        call_command('import_csv', checkpoint_dir=str(tmp_path),
+                     stdout=StringIO())
+        reviews_count = Review.objects.count()
+        with open(tmp_path / 'review.json') as checkpoint:
+            state = json.load(checkpoint)
+        assert state['done'] and state['rows'] == reviews_count, (
+            'Проверьте, что команда `import_csv` с `--checkpoint-dir` '
+            'сохраняет прогресс загрузки каждого файла.'
+        )
+
+        # Имитируем прерванную загрузку: в базе только первые 10 отзывов.
+        with open(settings.BASE_DIR / 'static/data/review.csv',
+                  encoding='utf-8', newline='') as csv_file:
+            loaded_ids = [
+                int(row['id']) for row in list(csv.DictReader(csv_file))[:10]
+            ]
+        Review.objects.exclude(pk__in=loaded_ids).delete()
+        state.update(rows=10, done=False)
+        with open(tmp_path / 'review.json', 'w') as checkpoint:
+            json.dump(state, checkpoint)
+
+        out = StringIO()
+        call_command('import_csv', checkpoint_dir=str(tmp_path), stdout=out)
+        assert 'category: 3 rows already imported' in out.getvalue(), (
+            'Проверьте, что повторный запуск `import_csv` пропускает уже '
+            'загруженные файлы.'
+        )
+        assert Review.objects.count() == reviews_count, (
+            'Проверьте, что повторный запуск `import_csv` дозагружает файл '
+            'с сохранённой позиции.'
+        )
+
+    def test_03_import_csv_rejects_missing_references(self, tmp_path):
+        import csv
+        import shutil
+
+        from django.conf import settings
+        from django.core.management.base import CommandError
+        from reviews.models import Review
+
+        data_dir = tmp_path / 'data'
+        shutil.copytree(settings.BASE_DIR / 'static/data', data_dir)
+        review_csv = data_dir / 'review.csv'
+        review_csv.write_text(
+            review_csv.read_text(encoding='utf-8').rstrip('\n')
+            + '\n100500,999999,Сирота,100,5,2019-09-24T21:08:21.567Z\n',
+            encoding='utf-8'
+        )
+        with open(review_csv, encoding='utf-8', newline='') as file:
+            orphan_row = len(list(csv.reader(file))) - 1
+        with pytest.raises(CommandError) as error:
+            call_command('import_csv', path=str(data_dir), stdout=StringIO())
+        assert f'review.csv, row {orphan_row}:' in str(error.value), (
+            'Проверьте, что `import_csv` сообщает файл и строку со ссылкой '
+            'на несуществующую запись.'
+        )
+        assert not Review.objects.filter(pk=100500).exists(), (
+            'Проверьте, что `import_csv` не загружает строки со ссылкой '
+            'на несуществующую запись.'
+        )
+
+    def test_04_import_csv_reports_rows_not_loaded(self):
+        from django.core.management.base import CommandError
+        from reviews.models import Title
+
+        call_command('import_csv', stdout=StringIO())
+        # Та же пара произведение-жанр под другим id: строка файла
+        # не вставится, а число записей в таблице останется прежним.
+        through = Title.genre.through
+        first = through.objects.order_by('id').first()
+        first.delete()
+        through.objects.create(id=100500, title_id=first.title_id,
+                               genre_id=first.genre_id)
+        with pytest.raises(CommandError) as error:
+            call_command('import_csv', stdout=StringIO())
+        assert 'genre_title: 1 of' in str(error.value), (
+            'Проверьте, что `import_csv` сверяет загруженные строки по id, '
+            'а не по общему числу записей в таблице.'
+        )
+        assert '(rows 1)' in str(error.value)
+
+    def test_05_import_csv_workers(self, tmp_path):
+        import os
+        import sqlite3
+        import subprocess
+        import sys
+
+        from django.conf import settings
+
+        # Процессы --workers открывают свои соединения, поэтому нужна
+        # база в файле, а не тестовая база в памяти.
+        env = dict(os.environ, DB_NAME=str(tmp_path / 'import.sqlite3'))
+        for command in (['migrate'],
+                        ['import_csv', '--workers', '3', '--batch-size', '7']):
+            result = subprocess.run(
+                [sys.executable, 'manage.py', *command], env=env,
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+                timeout=300
+            )
+            assert result.returncode == 0, (
+                f'Проверьте, что команда `{" ".join(command)}` выполняется '
+                f'без ошибок: {result.stderr}'
+            )
+        assert 'total:' in result.stdout
+        with sqlite3.connect(tmp_path / 'import.sqlite3') as db:
+            counts = {
+                table: db.execute(
+                    f'SELECT COUNT(*) FROM {table}'
+                ).fetchone()[0]
+                for table in ('reviews_category', 'reviews_genre',
+                              'users_user', 'reviews_title', 'reviews_review',
+                              'reviews_comment')
+            }
+        assert all(counts.values()), (
+            'Проверьте, что `import_csv --workers` загружает все файлы: '
+            f'{counts}'
+        )
+
+    def test_06_import_csv_resets_response_cache(self, client, monkeypatch):
+        from api.management.commands import import_csv
+
+        response = client.get('/api/v1/titles/')
+        assert response.json()['count'] == 0
+        etag = response['ETag']
+        commands = []
+
+        def record_command(name, **options):
+            commands.append((name, options.get('database')))
+            return call_command(name, **options)
+
+        monkeypatch.setattr(import_csv, 'call_command', record_command)
+        call_command('import_csv', stdout=StringIO())
+        assert commands == [('rebuild_ratings', 'default'),
+                            ('rebuild_search_index', 'default')], (
+            'Проверьте, что `import_csv` пересчитывает рейтинги '
+            'и поисковый индекс в базе из `--database`.'
+        )
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.json()['count'], (
+            'Проверьте, что после `import_csv` закэшированные ответы '
+            'и их ETag перестают действовать.'
+        )
@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_comments
+
+HOT_TABLES = ('reviews_title', 'reviews_review', 'reviews_comment',
+              'reviews_title_genre')
+
+
+def get_query_plans(client, url, params=None):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == HTTPStatus.OK
+    plans = []
+    with connection.cursor() as cursor:
+        for query in queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+            plans.append(
+                (query['sql'], [row[-1] for row in cursor.fetchall()])
+            )
+    return plans
+
+
+def find_full_scans(plans):
+    """Шаги плана с полным сканированием или сортировкой без индекса."""
+    return [
+        (sql, step) for sql, steps in plans for step in steps
+        if (step.startswith('SCAN ') and step.split()[1] in HOT_TABLES)
+        or 'TEMP B-TREE FOR ORDER BY' in step
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09QueryPlans:
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite',
+                        reason='EXPLAIN QUERY PLAN is SQLite-specific')
+    def test_01_list_queries_use_indexes(self, admin_client, admin, user,
+                                         user_client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        reviews_url = f'/api/v1/titles/{title_id}/reviews/'
+        comments_url = f'{reviews_url}{review_id}/comments/'
+        requests = (
+            ('/api/v1/titles/', {'year': 1984}),
+            ('/api/v1/titles/', {'category': 'films'}),
+            ('/api/v1/titles/', {'category': 'films', 'year': 1984}),
+            ('/api/v1/titles/', {'genre': 'horror,comedy'}),
+            ('/api/v1/titles/', {'genre': 'horror,comedy',
+                                 'genre_match': 'all'}),
+            (f'/api/v1/titles/{title_id}/', None),
+            (reviews_url, None),
+            (reviews_url, {'cursor': '', 'limit': 1}),
+            (f'{reviews_url}{review_id}/', None),
+            (comments_url, None),
+            (comments_url, {'cursor': '', 'limit': 1}),
+        )
+        for url, params in requests:
+            plans = get_query_plans(admin_client, url, params)
+            assert not find_full_scans(plans), (
+                f'Проверьте, что запросы GET `{url}` с параметрами {params} '
+                'используют индексы. Полное сканирование: '
+                f'{find_full_scans(plans)}'
+            )
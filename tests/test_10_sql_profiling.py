@@ -0,0 +1,78 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+
+from api.profiling import fingerprint
+from tests.utils import create_titles
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.SQL_PROFILING = {
+        'ENABLED': True,
+        'SLOW_REQUEST_MS': 10 ** 6,
+        'DUPLICATE_THRESHOLD': 2,
+    }
+    return settings.SQL_PROFILING
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10SQLProfiling:
+
+    def test_01_fingerprint_ignores_literals(self):
+        first = fingerprint(
+            'SELECT * FROM "users_user" WHERE "users_user"."id" = 1'
+        )
+        second = fingerprint(
+            'SELECT * FROM "users_user" WHERE "users_user"."id" = 25'
+        )
+        assert first == second, (
+            'Проверьте, что отпечаток запроса не зависит от значений '
+            'литералов.'
+        )
+        assert fingerprint('WHERE "id" IN (%s, %s, %s)') == fingerprint(
+            'WHERE "id" IN (%s)'
+        ), (
+            'Проверьте, что отпечаток запроса не зависит от длины списка IN.'
+        )
+
+    def test_02_server_timing_and_log(self, client, admin_client, profiling,
+                                      caplog):
+        create_titles(admin_client)
+        caplog.set_level(logging.INFO, logger='api.profiling')
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        server_timing = response.get('Server-Timing', '')
+        assert 'db;dur=' in server_timing and 'queries' in server_timing, (
+            'Проверьте, что при включённом SQL_PROFILING ответ содержит '
+            'заголовок `Server-Timing` со временем запросов к БД.'
+        )
+        records = [
+            record.profile for record in caplog.records
+            if hasattr(record, 'profile')
+        ]
+        assert records and records[-1]['view'] == 'TitleViewSet.list', (
+            'Проверьте, что в лог пишется имя viewset и action запроса.'
+        )
+        assert records[-1]['queries'] > 0
+
+    def test_03_slow_request_log(self, client, profiling, caplog):
+        profiling['SLOW_REQUEST_MS'] = 0
+        caplog.set_level(logging.WARNING, logger='api.profiling.slow')
+        client.get('/api/v1/genres/')
+        slow = [
+            record for record in caplog.records
+            if record.name == 'api.profiling.slow'
+        ]
+        assert slow and 'slowest' in slow[0].profile, (
+            'Проверьте, что запросы дольше SLOW_REQUEST_MS пишутся в лог '
+            '`api.profiling.slow` вместе с самыми долгими SQL-запросами.'
+        )
+
+    def test_04_disabled_by_default(self, client):
+        response = client.get('/api/v1/genres/')
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что профилирование выключено, пока не включена '
+            'настройка SQL_PROFILING.'
+        )
@@ -0,0 +1,101 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+from api.metrics import registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def get_metrics(client):
+    response = client.get('/metrics')
+    assert response.status_code == HTTPStatus.OK, (
+        'Проверьте, что эндпоинт `/metrics` доступен.'
+    )
+    assert response['Content-Type'].startswith('text/plain')
+    return response.content.decode()
+
+
+def get_sample(metrics, name):
+    for line in metrics.splitlines():
+        if line.startswith(name + ' ') or line.startswith(name + '{'):
+            if line.rsplit(' ', 1)[0] == name:
+                return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11Metrics:
+
+    def test_01_requests_by_route(self, client):
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/titles/100/')
+        metrics = get_metrics(client)
+        genres = ('yamdb_http_requests_total'
+                  '{route="genres-list",method="GET",status="200"}')
+        assert get_sample(metrics, genres) == 2, (
+            'Проверьте, что `/metrics` считает запросы по имени маршрута, '
+            'методу и статусу.'
+        )
+        detail = ('yamdb_http_requests_total'
+                  '{route="titles-detail",method="GET",status="404"}')
+        assert get_sample(metrics, detail) == 1
+        histogram = ('yamdb_http_request_duration_seconds_count'
+                     '{route="genres-list",method="GET",status="200"}')
+        assert get_sample(metrics, histogram) == 2, (
+            'Проверьте, что `/metrics` отдаёт гистограмму латентности '
+            'по маршрутам, методам и статусам.'
+        )
+        histogram = ('yamdb_http_request_duration_seconds_count'
+                     '{route="titles-detail",method="GET",status="404"}')
+        assert get_sample(metrics, histogram) == 1, (
+            'Проверьте, что латентность ошибок считается отдельно '
+            'от латентности успешных ответов.'
+        )
+        queries = 'yamdb_db_queries_total{route="genres-list",method="GET"}'
+        assert get_sample(metrics, queries) > 0
+        for name in ('yamdb_cache_hit_ratio{namespace="genres"}',
+                     'yamdb_email_queue_depth',
+                     'yamdb_email_outbox_pending'):
+            assert get_sample(metrics, name) is not None, (
+                f'Проверьте, что `/metrics` содержит метрику `{name}`.'
+            )
+
+    def test_02_multiprocess_aggregation(self, client, settings, tmp_path):
+        settings.METRICS = dict(settings.METRICS, MULTIPROCESS_DIR=tmp_path)
+        other = registry.snapshot()
+        other.update(
+            pid=1,
+            requests=[['genres-list', 'GET', '200', 5]],
+            latency=[['genres-list', 'GET', '200',
+                      [5] + [0] * len(registry.buckets), 0.5]],
+            email_queue=3,
+        )
+        (tmp_path / 'metrics-1.json').write_text(json.dumps(other))
+        client.get('/api/v1/genres/')
+        metrics = get_metrics(client)
+        genres = ('yamdb_http_requests_total'
+                  '{route="genres-list",method="GET",status="200"}')
+        assert get_sample(metrics, genres) == 6, (
+            'Проверьте, что `/metrics` суммирует снимки всех процессов '
+            'из MULTIPROCESS_DIR.'
+        )
+        histogram = ('yamdb_http_request_duration_seconds_count'
+                     '{route="genres-list",method="GET",status="200"}')
+        assert get_sample(metrics, histogram) == 6
+        assert list(tmp_path.glob('metrics-*.json')), (
+            'Проверьте, что процесс сохраняет свой снимок в MULTIPROCESS_DIR.'
+        )
+
+    def test_03_token(self, client, settings):
+        settings.METRICS = dict(settings.METRICS, TOKEN='secret')
+        assert client.get('/metrics').status_code == HTTPStatus.FORBIDDEN
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == HTTPStatus.OK
@@ -0,0 +1,187 @@
+import threading
+from http import HTTPStatus
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection
+
+from api_yamdb.db import get_databases, replica_reads, use_replicas
+from api_yamdb.db.pool import ConnectionPool
+from api_yamdb.db.router import ReplicaRouter
+from reviews.models import Title
+from tests.utils import create_titles
+
+BASE_DIR = Path('/srv/yamdb')
+
+
+class Test12DatabaseSettings:
+
+    def test_01_sqlite_profile(self):
+        databases = get_databases(BASE_DIR, {
+            'DB_REPLICAS': '/tmp/replica.sqlite3',
+        })
+        assert databases['default']['NAME'] == BASE_DIR / 'db.sqlite3', (
+            'Проверьте, что по умолчанию используется файл SQLite '
+            'в BASE_DIR.'
+        )
+        replica = databases.get('replica_1')
+        assert replica and replica['NAME'] == '/tmp/replica.sqlite3', (
+            'Проверьте, что DB_REPLICAS добавляет реплики replica_N.'
+        )
+        assert replica['TEST'] == {'MIRROR': 'default'}
+
+    def test_02_postgresql_profile(self):
+        databases = get_databases(BASE_DIR, {
+            'DB_ENGINE': 'postgresql',
+            'DB_HOST': 'primary',
+            'DB_CONN_MAX_AGE': '120',
+            'DB_REPLICAS': 'replica-a,replica-b:6432',
+        })
+        default = databases['default']
+        assert default['ENGINE'] == 'api_yamdb.db.postgresql', (
+            'Проверьте, что профиль PostgreSQL по умолчанию использует '
+            'бэкенд с пулом соединений.'
+        )
+        assert default['CONN_MAX_AGE'] == 120
+        assert default['POOL']['TIMEOUT'] == 10
+        assert (databases['replica_2']['HOST'],
+                databases['replica_2']['PORT']) == ('replica-b', '6432')
+        databases = get_databases(BASE_DIR, {
+            'DB_ENGINE': 'postgresql', 'DB_POOL_SIZE': '0'
+        })
+        assert databases['default']['ENGINE'] == (
+            'django.db.backends.postgresql'
+        )
+        with pytest.raises(ImproperlyConfigured):
+            get_databases(BASE_DIR, {'DB_ENGINE': 'oracle'})
+
+    def test_03_replica_router(self):
+        router = ReplicaRouter()
+        with mock.patch('api_yamdb.db.router.get_replicas',
+                        return_value=['replica_1']):
+            assert router.db_for_read(Title) is None
+            with use_replicas():
+                assert router.db_for_read(Title) == 'replica_1', (
+                    'Проверьте, что внутри use_replicas() чтение идёт '
+                    'на реплику.'
+                )
+                assert router.db_for_write(Title) == 'default'
+        assert router.allow_migrate('replica_1', 'reviews') is False
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12ReplicaReads:
+
+    def test_01_safe_requests_read_from_replicas(self, client, admin_client,
+                                                 user_client, settings):
+        settings.DATABASE_REPLICA_LAG = 0
+        titles, _, _ = create_titles(admin_client)
+        reads = []
+
+        def db_for_read(router, model, **hints):
+            reads.append(replica_reads.get())
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', autospec=True,
+                               side_effect=db_for_read):
+            client.get('/api/v1/titles/')
+            assert reads and all(reads), (
+                'Проверьте, что GET-запросы к произведениям читают данные '
+                'с реплик.'
+            )
+            reads.clear()
+            response = user_client.post(
+                f'/api/v1/titles/{titles[0]["id"]}/reviews/',
+                data={'text': 'Отзыв', 'score': 5}
+            )
+            assert response.status_code == HTTPStatus.CREATED
+            assert not any(reads), (
+                'Проверьте, что запросы на запись читают только с default.'
+            )
+
+            settings.DATABASE_REPLICA_LAG = 60
+            reads.clear()
+            client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/')
+            assert reads and not any(reads), (
+                'Проверьте, что сразу после записи лента читается с default, '
+                'пока реплики могут отставать.'
+            )
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Test12ConnectionPool:
+
+    def test_01_exhausted_pool(self):
+        pool = ConnectionPool(FakeConnection, min_size=1, max_size=2,
+                              timeout=0.05)
+        connections = [pool.getconn(), pool.getconn()]
+        with pytest.raises(OperationalError):
+            pool.getconn()
+        waiting = threading.Timer(0.05, pool.putconn, [connections[0]])
+        waiting.start()
+        pool.timeout = 5
+        assert pool.getconn() is connections[0], (
+            'Проверьте, что при занятом пуле новое соединение ждёт, '
+            'пока другое вернут в пул.'
+        )
+        waiting.join()
+
+    def test_02_returned_connection_reused(self):
+        created = []
+
+        def connect():
+            created.append(FakeConnection())
+            return created[-1]
+
+        pool = ConnectionPool(connect, min_size=0, max_size=1, timeout=0.05)
+        connection = pool.getconn()
+        pool.putconn(connection)
+        assert pool.getconn() is connection and len(created) == 1, (
+            'Проверьте, что возвращённое соединение выдаётся снова.'
+        )
+        pool.putconn(connection, close=True)
+        assert connection.closed
+        assert pool.getconn() is not connection and len(created) == 2, (
+            'Проверьте, что закрытое соединение не возвращается в пул.'
+        )
+
+
+@pytest.mark.django_db
+class Test12SQLitePragmas:
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite',
+                        reason='SQLite pragmas')
+    def test_01_connection_pragmas(self, settings, tmp_path):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            busy_timeout = cursor.fetchone()[0]
+            cursor.execute('PRAGMA cache_size')
+            cache_size = cursor.fetchone()[0]
+        assert busy_timeout == settings.SQLITE_PRAGMAS['busy_timeout'], (
+            'Проверьте, что соединение SQLite настраивается '
+            'по SQLITE_PRAGMAS.'
+        )
+        assert cache_size == settings.SQLITE_PRAGMAS['cache_size']
+        # Отдельный файл: в памяти с cache=shared настройки страниц
+        # общие у всех соединений.
+        raw = connection.get_new_connection(dict(
+            connection.get_connection_params(),
+            database=str(tmp_path / 'pragmas.sqlite3'), uri=False
+        ))
+        try:
+            cache_size = raw.execute('PRAGMA cache_size').fetchone()[0]
+        finally:
+            raw.close()
+        assert cache_size == settings.SQLITE_PRAGMAS['cache_size'], (
+            'Проверьте, что настройки SQLITE_PRAGMAS применяет сам '
+            'бэкенд при открытии соединения, а не сигнал.'
+        )
@@ -0,0 +1,73 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, RequestFactory
+
+from api.async_views import as_async_view
+from api.metrics import registry
+from api.views import ReviewViewSet, TitleViewSet
+from reviews.models import Category, Title
+
+
+@pytest.fixture
+def title():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    return Title.objects.create(name='Титаник', year=1997,
+                                category=category, description='')
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13AsyncViews:
+
+    def test_01_async_list(self, title):
+        view = as_async_view(TitleViewSet.as_view({'get': 'list'}))
+        assert asyncio.iscoroutinefunction(view), (
+            'Проверьте, что `as_async_view` возвращает асинхронное '
+            'представление.'
+        )
+        request = RequestFactory().get('/api/v1/titles/')
+        response = async_to_sync(view)(request)
+        assert response.status_code == HTTPStatus.OK
+        assert response.has_header('ETag'), (
+            'Проверьте, что асинхронное представление списка произведений '
+            'отдаёт заголовок ETag.'
+        )
+        assert 'Титаник' in response.content.decode()
+
+    def test_02_not_modified_without_queries(self, title, monkeypatch):
+        view = as_async_view(ReviewViewSet.as_view({'get': 'list'}))
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        factory = RequestFactory()
+        response = async_to_sync(view)(factory.get(url), title_id=title.id)
+        assert response.status_code == HTTPStatus.OK
+        calls = []
+        monkeypatch.setattr(ReviewViewSet, 'list',
+                            lambda *args, **kwargs: calls.append(args))
+        request = factory.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        response = async_to_sync(view)(request, title_id=title.id)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что асинхронное представление отвечает 304 '
+            'на If-None-Match с актуальным ETag.'
+        )
+        assert not calls, (
+            'Проверьте, что ответ 304 асинхронного представления '
+            'отдаётся без построения списка.'
+        )
+
+    def test_03_middleware_under_asgi(self, title):
+        registry.reset()
+        response = async_to_sync(AsyncClient().get)('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        snapshot = registry.snapshot()
+        assert ['titles-list', 'GET', '200', 1] in snapshot['requests'], (
+            'Проверьте, что MetricsMiddleware учитывает запросы '
+            'в ASGI-обработчике.'
+        )
+        queries = dict(((route, method), value)
+                       for route, method, value in snapshot['queries'])
+        assert queries[('titles-list', 'GET')] > 0, (
+            'Проверьте, что SQL-запросы считаются и в ASGI-обработчике.'
+        )
+        registry.reset()
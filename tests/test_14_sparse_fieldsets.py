@@ -0,0 +1,87 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_comments, create_titles, data_queries
+
+
+def get(client, url, params=None):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == HTTPStatus.OK, (
+        f'Проверьте, что GET `{url}` с параметрами {params} '
+        'возвращает статус 200.'
+    )
+    return response.json(), data_queries(
+        [query['sql'] for query in queries]
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14SparseFieldsets:
+
+    def test_01_titles_fields(self, admin_client, client):
+        create_titles(admin_client)
+        data, queries = get(client, '/api/v1/titles/',
+                            {'fields': 'id,name,rating'})
+        for title in data['results']:
+            assert set(title) == {'id', 'name', 'rating'}, (
+                'Проверьте, что `?fields=` оставляет в ответе '
+                '`/api/v1/titles/` только перечисленные поля.'
+            )
+        assert not any('reviews_genre' in sql or 'description' in sql
+                       for sql in queries), (
+            'Проверьте, что `?fields=` сокращает SELECT до нужных колонок '
+            'и не загружает жанры, если они не запрошены.'
+        )
+        data, queries = get(client, f'/api/v1/titles/{title["id"]}/',
+                            {'fields': 'genre'})
+        assert set(data) == {'genre'}
+        assert any('reviews_genre' in sql for sql in queries)
+
+    def test_02_reviews_expand(self, admin_client, admin, user, user_client,
+                               client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        title = titles[0]
+        url = f'/api/v1/titles/{title["id"]}/reviews/'
+        data, _ = get(client, url, {'fields': 'id,author',
+                                    'expand': 'title'})
+        assert data['results'][0] == {
+            'id': data['results'][0]['id'],
+            'author': data['results'][0]['author'],
+            'title': {'id': title['id'], 'name': title['name'],
+                      'year': title['year']},
+        }, (
+            'Проверьте, что `?expand=title` заменяет id произведения '
+            'в отзыве вложенным объектом.'
+        )
+        data, _ = get(client, f'{url}{reviews[0]["id"]}/comments/',
+                      {'expand': 'review'})
+        assert data['results'][0]['review']['id'] == reviews[0]['id']
+        response = client.get(url, {'fields': 'id,unknown'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что неизвестное поле в `?fields=` '
+            'возвращает статус 400.'
+        )
+        response = client.get(url, {'expand': 'author'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_03_reviews_without_n_plus_one(self, admin_client, admin, user,
+                                           user_client, client):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        for params in (None, {'cursor': ''}, {'cursor': '',
+                                              'fields': 'id,score'}):
+            data, queries = get(client, url, params)
+            assert len(data['results']) == 2
+            assert len(queries) <= 3, (
+                f'Проверьте, что лента отзывов с параметрами {params} '
+                'не делает отдельный запрос на каждый отзыв: '
+                f'{queries}'
+            )
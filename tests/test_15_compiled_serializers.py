@@ -0,0 +1,40 @@
+import pytest
+
+from api.serializers import CompiledTitleSerializer, ReadOnlyTitleSerializer
+from reviews.models import Title
+from tests.utils import create_reviews
+
+
+def serialize(fields=None):
+    titles = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre').order_by('pk')
+    rows = CompiledTitleSerializer(fields=fields).values_queryset(
+        Title.objects.order_by('pk')
+    )
+    return (ReadOnlyTitleSerializer(titles, many=True, fields=fields).data,
+            CompiledTitleSerializer(rows, many=True, fields=fields).data)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15CompiledSerializers:
+
+    def test_01_same_output(self, admin_client, admin, user, user_client,
+                            client):
+        create_reviews(admin_client, {admin: admin_client, user: user_client})
+        Title.objects.create(name='Без категории', year=2000,
+                             description='')
+        expected, data = serialize()
+        assert data == expected, (
+            'Проверьте, что CompiledTitleSerializer отдаёт тот же ответ, '
+            'что и ReadOnlyTitleSerializer.'
+        )
+        assert [title['rating'] for title in data] == [5, None, None]
+        for fields in (('id', 'name', 'rating'), ('genre',), ('category',)):
+            expected, data = serialize(fields)
+            assert data == expected
+        response = client.get('/api/v1/titles/')
+        assert response.json()['results'] == serialize()[0], (
+            'Проверьте, что список `/api/v1/titles/` совпадает '
+            'с ответом ReadOnlyTitleSerializer.'
+        )
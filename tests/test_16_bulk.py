@@ -0,0 +1,241 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Genre, Title
+from tests.utils import data_queries
+
+
+def bulk(client, url, method, data):
+    return getattr(client, method)(url, data=data, format='json')
+
+
+def create_catalog(admin_client):
+    response = bulk(admin_client, '/api/v1/categories/bulk/', 'post', [
+        {'name': 'Фильм', 'slug': 'films'},
+        {'name': 'Книга', 'slug': 'books'},
+    ])
+    assert response.status_code == HTTPStatus.CREATED, (
+        'Проверьте, что POST-запрос администратора к '
+        '`/api/v1/categories/bulk/` создаёт категории и возвращает 201.'
+    )
+    response = bulk(admin_client, '/api/v1/genres/bulk/', 'post', [
+        {'name': f'Жанр {idx}', 'slug': f'genre-{idx}'} for idx in range(5)
+    ])
+    assert response.status_code == HTTPStatus.CREATED
+    titles = [
+        {'name': f'Произведение {idx}', 'year': 2000 + idx,
+         'description': 'Описание', 'category': 'films',
+         'genre': [f'genre-{genre}' for genre in range(idx % 5 + 1)]}
+        for idx in range(10)
+    ]
+    with CaptureQueriesContext(connection) as queries:
+        response = bulk(admin_client, '/api/v1/titles/bulk/', 'post', titles)
+    assert response.status_code == HTTPStatus.CREATED, (
+        'Проверьте, что POST-запрос администратора к `/api/v1/titles/bulk/` '
+        'создаёт произведения и возвращает 201.'
+    )
+    return response.json(), [query['sql'] for query in queries]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16Bulk:
+
+    def test_01_create(self, admin_client, user_client):
+        titles, queries = create_catalog(admin_client)
+        assert len(titles) == 10
+        assert titles[3]['genre'] == ['genre-0', 'genre-1', 'genre-2',
+                                      'genre-3']
+        assert titles[3]['category'] == 'films'
+        assert Title.objects.get(pk=titles[3]['id']).genre.count() == 4
+        genre_lookups = [sql for sql in queries
+                         if '"reviews_genre"."slug" IN' in sql]
+        assert len(genre_lookups) == 1, (
+            'Проверьте, что slug жанров всех произведений bulk-запроса '
+            'ищутся одним запросом.'
+        )
+        genre_inserts = [sql for sql in queries
+                         if sql.startswith('INSERT INTO "reviews_title_genre')]
+        assert len(genre_inserts) == 1, (
+            'Проверьте, что связи произведений с жанрами '
+            'записываются одним запросом.'
+        )
+        response = bulk(user_client, '/api/v1/genres/bulk/', 'post',
+                        [{'name': 'Жанр', 'slug': 'genre'}])
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+    def test_02_per_item_errors(self, admin_client):
+        create_catalog(admin_client)
+        response = bulk(admin_client, '/api/v1/titles/bulk/', 'post', [
+            {'name': 'Верное', 'year': 2001, 'description': 'Описание',
+             'category': 'films', 'genre': ['genre-1']},
+            {'name': 'Неверное', 'year': 2001, 'description': 'Описание',
+             'category': 'films', 'genre': ['genre-1', 'unknown']},
+        ])
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()
+        assert errors[0] == {} and 'genre' in errors[1], (
+            'Проверьте, что bulk-запрос возвращает ошибки '
+            'по позициям элементов.'
+        )
+        response = bulk(admin_client, '/api/v1/genres/bulk/', 'post', [
+            {'name': 'Новый', 'slug': 'new'},
+            {'name': 'Новый', 'slug': 'new'},
+        ])
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json()[0] == {} and 'slug' in response.json()[1]
+        assert not Title.objects.filter(name='Верное').exists(), (
+            'Проверьте, что при ошибке в любом элементе bulk-запрос '
+            'ничего не записывает.'
+        )
+        assert not Genre.objects.filter(slug='new').exists()
+
+    def test_03_update(self, admin_client, client):
+        titles, _ = create_catalog(admin_client)
+        response = bulk(admin_client, '/api/v1/titles/bulk/', 'patch', [
+            {'id': titles[0]['id'], 'name': 'Переименованное'},
+            {'id': titles[1]['id'], 'genre': ['genre-4'],
+             'category': 'books'},
+        ])
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что PATCH-запрос администратора к '
+            '`/api/v1/titles/bulk/` изменяет произведения.'
+        )
+        assert response.json()[0]['name'] == 'Переименованное'
+        assert response.json()[1]['genre'] == ['genre-4']
+        title = Title.objects.get(pk=titles[1]['id'])
+        assert title.category.slug == 'books'
+        response = client.get('/api/v1/titles/',
+                              {'search': 'Переименованное'})
+        assert [title['id'] for title in response.json()['results']] == [
+            titles[0]['id']
+        ]
+        response = bulk(admin_client, '/api/v1/titles/bulk/', 'patch', [
+            {'id': titles[0]['id'], 'name': 'Ещё раз'},
+            {'id': 100500, 'name': 'Нет такого'},
+        ])
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == [{}, {'id': ['Объект не найден.']}]
+
+    def test_04_delete(self, admin_client):
+        titles, _ = create_catalog(admin_client)
+        ids = [title['id'] for title in titles[:3]]
+        response = bulk(admin_client, '/api/v1/titles/bulk/', 'delete',
+                        [ids[0], 100500])
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert Title.objects.filter(pk=ids[0]).exists()
+        response = bulk(admin_client, '/api/v1/titles/bulk/', 'delete', ids)
+        assert response.status_code == HTTPStatus.NO_CONTENT, (
+            'Проверьте, что DELETE-запрос администратора к '
+            '`/api/v1/titles/bulk/` удаляет произведения.'
+        )
+        assert not Title.objects.filter(pk__in=ids).exists()
+        response = bulk(admin_client, '/api/v1/genres/bulk/', 'delete',
+                        ['genre-0', 'genre-1'])
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert Genre.objects.count() == 3
+        response = bulk(admin_client, '/api/v1/genres/bulk/', 'patch',
+                        [{'slug': 'genre-2', 'name': 'Жанр'}])
+        assert response.status_code == HTTPStatus.METHOD_NOT_ALLOWED
+
+    def test_05_title_genres_in_one_query(self, admin_client):
+        create_catalog(admin_client)
+        counts = []
+        for genres in (['genre-0'], [f'genre-{idx}' for idx in range(5)]):
+            with CaptureQueriesContext(connection) as queries:
+                response = admin_client.post('/api/v1/titles/', data={
+                    'name': 'Произведение', 'year': 2000,
+                    'description': 'Описание', 'category': 'films',
+                    'genre': genres,
+                }, format='json')
+            assert response.status_code == HTTPStatus.CREATED
+            counts.append(len(queries))
+        assert counts[0] == counts[1], (
+            'Проверьте, что число запросов при создании произведения '
+            'не зависит от числа жанров.'
+        )
+        title_url = f'/api/v1/titles/{response.json()["id"]}/'
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.patch(title_url, data={
+                'genre': ['genre-1', 'genre-2', 'genre-1'],
+            }, format='json')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['genre'] == ['genre-1', 'genre-2']
+        assert len([query for query in queries
+                    if '"reviews_genre"."slug" IN' in query['sql']]) == 1
+        response = admin_client.patch(title_url, data={
+            'genre': ['genre-1', 'missing-1', 'missing-2'],
+        }, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        message = response.json()['genre'][0]
+        assert 'missing-1' in message and 'missing-2' in message, (
+            'Проверьте, что ответ перечисляет все несуществующие жанры.'
+        )
+
+    def test_06_queries_do_not_grow_with_items(self, admin_client, client):
+        counts = []
+        for size in (2, 20):
+            genres = [{'name': f'Жанр {idx}', 'slug': f'g{size}-{idx}'}
+                      for idx in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = bulk(admin_client, '/api/v1/genres/bulk/', 'post',
+                                genres)
+            assert response.status_code == HTTPStatus.CREATED
+            counts.append(len(data_queries(
+                [query['sql'] for query in queries]
+            )))
+        assert counts[0] == counts[1], (
+            'Проверьте, что уникальность slug всех элементов bulk-запроса '
+            'проверяется одним запросом, а не запросом на элемент.'
+        )
+        response = bulk(admin_client, '/api/v1/genres/bulk/', 'post', [
+            {'name': 'Новый', 'slug': 'new'},
+            {'name': 'Занятый', 'slug': 'g2-1'},
+        ])
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json()[0] == {} and 'slug' in response.json()[1], (
+            'Проверьте, что bulk-запрос не создаёт объект с занятым slug.'
+        )
+
+        titles, queries = create_catalog(admin_client)
+        title_inserts = [sql for sql in queries
+                         if sql.startswith('INSERT INTO "reviews_title"')]
+        assert len(title_inserts) == 1, (
+            'Проверьте, что произведения bulk-запроса вставляются '
+            'одним запросом.'
+        )
+        index_queries = [sql for sql in queries
+                         if sql.startswith(('DELETE FROM reviews_title_fts',
+                                            'INSERT INTO reviews_title_fts'))]
+        assert connection.vendor != 'sqlite' or len(index_queries) == 2, (
+            'Проверьте, что поисковый индекс обновляется для всего '
+            f'bulk-запроса сразу, а не по произведению: {index_queries}'
+        )
+        for title in titles:
+            assert Title.objects.get(pk=title['id']).name == title['name']
+        response = client.get('/api/v1/titles/', {'search': 'Произведение'})
+        assert response.json()['count'] == len(titles), (
+            'Проверьте, что созданные bulk-запросом произведения '
+            'попадают в поисковый индекс.'
+        )
+
+    def test_07_update_lookup_as_string(self, admin_client):
+        titles, _ = create_catalog(admin_client)
+        response = bulk(admin_client, '/api/v1/titles/bulk/', 'patch', [
+            {'id': str(titles[0]['id']), 'name': 'Строковый id'},
+        ])
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что PATCH-запрос к `/api/v1/titles/bulk/` '
+            'принимает id строкой.'
+        )
+        assert Title.objects.get(pk=titles[0]['id']).name == 'Строковый id'
+        response = bulk(admin_client, '/api/v1/titles/bulk/', 'patch', [
+            {'id': 'abc', 'name': 'Нет'}, {'name': 'Без id'},
+        ])
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == [
+            {'id': ['Некорректное значение.']},
+            {'id': ['Обязательное поле.']},
+        ]
@@ -0,0 +1,83 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review, Title
+from tests.utils import create_single_review, create_titles, data_queries
+
+
+def get_ratings(client, title_id, params=None):
+    url = f'/api/v1/titles/{title_id}/ratings/'
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == HTTPStatus.OK, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает статус 200.'
+    )
+    return response.json(), data_queries(
+        [query['sql'] for query in queries]
+    )
+
+
+def histogram(**counts):
+    return {str(score): counts.get(f's{score}', 0) for score in range(1, 11)}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17TitleRatings:
+
+    def test_01_histogram(self, admin_client, user_client, moderator_client,
+                          client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        data, queries = get_ratings(client, title_id)
+        assert data == {'id': title_id, 'rating': None, 'average': None,
+                        'count': 0, 'histogram': histogram()}, (
+            'Проверьте, что у произведения без отзывов '
+            '`/api/v1/titles/{id}/ratings/` возвращает нулевое распределение.'
+        )
+        create_single_review(admin_client, title_id, 'Отзыв', 10)
+        create_single_review(user_client, title_id, 'Отзыв', 7)
+        review = create_single_review(moderator_client, title_id, 'Отзыв', 7)
+        data, queries = get_ratings(client, title_id)
+        assert data == {'id': title_id, 'rating': 8, 'average': 8.0,
+                        'count': 3, 'histogram': histogram(s7=2, s10=1)}, (
+            'Проверьте, что `/api/v1/titles/{id}/ratings/` считает '
+            'оценки по значениям и среднюю оценку.'
+        )
+        assert len(queries) == 1 and 'reviews_review' not in queries[0], (
+            'Проверьте, что распределение оценок читается из строки '
+            'произведения одним запросом, без чтения отзывов.'
+        )
+        review_url = (f'/api/v1/titles/{title_id}/reviews/'
+                      f'{review.json()["id"]}/')
+        response = moderator_client.patch(review_url, data={'score': 1})
+        assert response.status_code == HTTPStatus.OK
+        data, _ = get_ratings(client, title_id)
+        assert data['histogram'] == histogram(s1=1, s7=1, s10=1), (
+            'Проверьте, что изменение оценки в отзыве переносит её '
+            'в другую ячейку распределения.'
+        )
+        response = moderator_client.delete(review_url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        data, _ = get_ratings(client, title_id, {'fields': 'histogram'})
+        assert data == {'histogram': histogram(s7=1, s10=1)}, (
+            'Проверьте, что удаление отзыва убирает его оценку '
+            'из распределения.'
+        )
+        response = client.get('/api/v1/titles/100500/ratings/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_02_rebuild(self, admin_client, user, admin):
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        Review.objects.create(author=user, title=title, text='1', score=3)
+        Review.objects.create(author=admin, title=title, text='2', score=3)
+        call_command('rebuild_ratings')
+        title.refresh_from_db()
+        assert title.score_histogram[3] == 2 and title.rating_count == 2, (
+            'Проверьте, что `rebuild_ratings` пересчитывает '
+            'распределение оценок по таблице отзывов.'
+        )
@@ -0,0 +1,169 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from reviews.models import TitleReviewDay
+from tests.utils import create_single_review, create_titles, data_queries
+
+
+def get_ranking(client, url, params=None):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == HTTPStatus.OK, (
+        f'Проверьте, что GET `{url}` с параметрами {params} '
+        'возвращает статус 200.'
+    )
+    return response.json(), data_queries(
+        [query['sql'] for query in queries]
+    )
+
+
+def create_rated_titles(admin_client, clients):
+    """Терминатор: одна 10. Крепкий орешек: три 9. Третье без отзывов."""
+    titles, _, _ = create_titles(admin_client)
+    create_single_review(admin_client, titles[0]['id'], 'Отзыв', 10)
+    reviews = [
+        create_single_review(client, titles[1]['id'], 'Отзыв', 9).json()
+        for client in clients
+    ]
+    response = admin_client.post('/api/v1/titles/', data={
+        'name': 'Без отзывов', 'year': 2000, 'category': 'films',
+        'description': 'Описание'
+    })
+    assert response.status_code == HTTPStatus.CREATED
+    return titles, reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18Rankings:
+
+    def test_01_top(self, admin_client, user_client, moderator_client,
+                    user_superuser_client, client):
+        titles, _ = create_rated_titles(
+            admin_client,
+            (user_client, moderator_client, user_superuser_client)
+        )
+        terminator, die_hard = titles[0]['id'], titles[1]['id']
+        url = '/api/v1/titles/top/'
+        data, queries = get_ranking(client, url)
+        assert [(title['id'], title['score']) for title in data] == [
+            (die_hard, 6.81), (terminator, 6.25)
+        ], (
+            'Проверьте, что `/api/v1/titles/top/` по умолчанию упорядочивает '
+            'произведения с отзывами по байесовской оценке.'
+        )
+        assert data[0]['rating'] == 9 and data[0]['genre'] == [
+            {'name': 'Драма', 'slug': 'drama'}
+        ]
+        assert len(queries) <= 3, (
+            'Проверьте, что рейтинг читается без запроса на каждое '
+            f'произведение: {queries}'
+        )
+        data, _ = get_ranking(client, url, {'score': 'average'})
+        assert [(title['id'], title['score']) for title in data] == [
+            (terminator, 10), (die_hard, 9)
+        ], (
+            'Проверьте, что `?score=average` упорядочивает произведения '
+            'по средней оценке.'
+        )
+        data, _ = get_ranking(client, url, {'category': 'books'})
+        assert [title['id'] for title in data] == [die_hard]
+        data, _ = get_ranking(client, url, {'genre': 'horror',
+                                            'fields': 'id,score'})
+        assert data == [{'id': terminator, 'score': 6.25}]
+        data, _ = get_ranking(client, url, {'limit': 1})
+        assert [title['id'] for title in data] == [die_hard]
+        for params in ({'score': 'median'}, {'limit': 0}, {'limit': 'x'}):
+            response = client.get(url, params)
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что `{url}` с параметрами {params} '
+                'возвращает статус 400.'
+            )
+
+    def test_02_trending(self, admin_client, user_client, moderator_client,
+                         client):
+        titles, reviews = create_rated_titles(
+            admin_client, (user_client, moderator_client)
+        )
+        terminator, die_hard = titles[0]['id'], titles[1]['id']
+        TitleReviewDay.objects.create(
+            title_id=terminator, reviews=10,
+            day=timezone.localdate() - timedelta(days=20)
+        )
+        url = '/api/v1/titles/trending/'
+        data, queries = get_ranking(client, url)
+        assert [(title['id'], title['score']) for title in data] == [
+            (die_hard, 2), (terminator, 1)
+        ], (
+            'Проверьте, что `/api/v1/titles/trending/` упорядочивает '
+            'произведения по числу отзывов за последние дни.'
+        )
+        assert not any('reviews_review' in sql for sql in queries), (
+            'Проверьте, что trending считает счётчики по дням, '
+            'а не отзывы.'
+        )
+        data, _ = get_ranking(client, url, {'days': 30})
+        assert [(title['id'], title['score']) for title in data] == [
+            (terminator, 11), (die_hard, 2)
+        ]
+        data, _ = get_ranking(client, url, {'genre': 'horror'})
+        assert [title['id'] for title in data] == [terminator]
+        response = moderator_client.delete(
+            f'/api/v1/titles/{die_hard}/reviews/{reviews[1]["id"]}/'
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        data, _ = get_ranking(client, url)
+        assert [(title['id'], title['score']) for title in data] == [
+            (die_hard, 1), (terminator, 1)
+        ], (
+            'Проверьте, что удаление отзыва уменьшает счётчик отзывов '
+            'произведения за день.'
+        )
+        response = client.get(url, {'days': 31})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        call_command('rebuild_ratings')
+        data, _ = get_ranking(client, url, {'days': 30})
+        assert [(title['id'], title['score']) for title in data] == [
+            (die_hard, 1), (terminator, 1)
+        ], (
+            'Проверьте, что `rebuild_ratings` пересчитывает счётчики '
+            'отзывов по дням по таблице отзывов.'
+        )
+
+    def test_03_old_review_days_pruned(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        terminator = titles[0]['id']
+        today = timezone.localdate()
+        old_day = today - timedelta(days=30)
+        kept_day = today - timedelta(days=29)
+        for day in (old_day, kept_day):
+            TitleReviewDay.objects.create(
+                title_id=terminator, day=day, reviews=1
+            )
+        create_single_review(admin_client, terminator, 'Отзыв', 10)
+        days = set(TitleReviewDay.objects.values_list('day', flat=True))
+        assert days == {kept_day, today}, (
+            'Проверьте, что счётчик отзывов за новый день удаляет '
+            'счётчики старше `MAX_TRENDING_DAYS` дней.'
+        )
+
+    def test_04_trending_cache_keyed_by_day(self, admin_client, user_client,
+                                            client, monkeypatch):
+        create_rated_titles(admin_client, (user_client,))
+        url = '/api/v1/titles/trending/'
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        response = client.get(url)
+        assert response['X-Cache'] == 'HIT'
+        tomorrow = timezone.localdate() + timedelta(days=7)
+        monkeypatch.setattr(timezone, 'localdate', lambda *args: tomorrow)
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS' and response.json() == [], (
+            'Проверьте, что кэш `/api/v1/titles/trending/` зависит от '
+            'текущей даты: окно дней сдвигается без записи в каталог.'
+        )
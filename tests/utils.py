@@ -102,6 +102,16 @@ invalid_data_for_user_patch_and_creation.extend([
 ])
 
 
+def data_queries(queries):
+    """
+    SQL-запросы без обращений к версиям кэша ответов (CacheVersion)
+    и транзакций, в которых создаются их строки.
+    """
+    return [sql for sql in queries
+            if 'reviews_cacheversion' not in sql
+            and not sql.startswith('BEGIN')]
+
+
 def check_pagination(url, respons_data, expected_count, post_data=None):
     expected_keys = ('count', 'next', 'previous', 'results')
     for key in expected_keys: